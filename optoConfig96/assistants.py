@@ -129,7 +129,7 @@ class InterpolateStepAssistant(HasTraits):
             pad_n = len(str(self.n))
             number = '%0.{n}d'.format(n=pad_n)
             step.name = self.name + '_' + number % (i + 1)
-        self.steplist.steps += steps
+        self.steplist.add_steps(steps)
 
         if self.assign_all_to_program:
             program = Program()
@@ -199,11 +199,12 @@ class SetAllAssistant(BaseStep):
         # Set update states for involved objects, so they only get updated
         # once verything has been set.
         self.steplist.start_update('updated')
-        updating_programs = []
+        updating_programs = set()
         for step in self.steplist.selected:
             for program in step.in_programs:
-                updating_programs.append(program)
-                program.start_update('steps_updated')
+                if program not in updating_programs:
+                    updating_programs.add(program)
+                    program.start_update('steps_updated')
             for param, value in d.items():
                 setattr(step, param, value)
         for program in updating_programs:
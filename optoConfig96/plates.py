@@ -53,6 +53,13 @@ class LED(HasTraits):
 
     color = Color
 
+    # The color as RGBA values in the 0-1 range, for plotting.
+    rgb = Property(depends_on='color')
+
+    @cached_property
+    def _get_rgb(self):
+        return utils.qt_color_to_rgb(self.color)
+
     name = Str('New LED')
 
     invalid = Property(depends_on='name_invalid, correction_factors_invalid')
@@ -64,7 +71,7 @@ class LED(HasTraits):
     def _get_correction_factors_invalid(self):
         if self.correction_factors is None:
             return False
-        elif (np.any(self.correction_factors) < 0 or np.any(self.correction_factors) > 1):
+        elif self.correction_factors.min() < 0 or self.correction_factors.max() > 1:
             return True
         else:
             return False
@@ -112,17 +119,44 @@ class LED(HasTraits):
         """ Try to read a file to a numpy array with different delimiter options """
         for delimiter in (',', ';', '\t'):
             try:
-                return np.loadtxt(file, delimiter=delimiter)
+                return np.loadtxt(file, delimiter=delimiter, dtype=np.float64, ndmin=2)
             except ValueError:
                 continue
         raise ValueError
 
+    @staticmethod
+    def read_plain(file, shape=(8, 12)):
+        """
+        Read a file of plain delimited numbers with the expected shape in one
+        pass.
+
+        Returns None if the file does not match, so that it can be read with
+        the more flexible `try_delimiters`.
+        """
+        with open(file, 'rb') as f:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+        if len(lines) != shape[0]:
+            return None
+        for delimiter in (b',', b';', b'\t'):
+            tokens = [line.split(delimiter) for line in lines]
+            if any(len(row) != shape[1] for row in tokens):
+                continue
+            try:
+                values = (float(token) for row in tokens for token in row)
+                factors = np.fromiter(values, dtype=np.float64, count=shape[0] * shape[1])
+            except ValueError:
+                return None
+            return factors.reshape(shape)
+        return None
+
     def read_correction(self):
         """ Try to read the provided file and generate a correction matrix. """
         if self.correction_file == '':
             return None
         try:
-            factors = self.try_delimiters(self.correction_file)
+            factors = self.read_plain(self.correction_file)
+            if factors is None:
+                factors = self.try_delimiters(self.correction_file)
         except Exception:
             msg = 'Could not read correction factors from file %s.'
             msg = msg % self.correction_file
@@ -132,7 +166,7 @@ class LED(HasTraits):
             msg = 'Expected 8 rows (but got %d) and 12 columns (but got %d).'
             msg = msg % (rows, cols)
             raise ValueError(msg)
-        if np.any(factors < 0) or np.any(factors > 1):
+        if factors.min() < 0 or factors.max() > 1:
             msg = 'Correction factors must be within 0 and 1.'
             raise ValueError(msg)
         return factors
@@ -180,38 +214,31 @@ class LED(HasTraits):
         return self.name
 
 
+# Rows, columns and wells per group for each supported grouping of the plate.
+_GROUPING_SPEC = {
+    '96-well': (8, 12, 1),
+    '24-well': (4, 6, 4),
+    '6-well': (2, 3, 16)
+}
+
+
 class Grouping(HasTraits):
     grouptype = Enum('96-well', '24-well')
 
     nrows = Property(depends_on='grouptype')
 
     def _get_nrows(self):
-        if self.grouptype == '96-well':
-            return 8
-        elif self.grouptype == '24-well':
-            return 4
-        elif self.grouptype == '6-well':
-            return 2
+        return _GROUPING_SPEC[self.grouptype][0]
 
     ncols = Property(depends_on='grouptype')
 
     def _get_ncols(self):
-        if self.grouptype == '96-well':
-            return 12
-        elif self.grouptype == '24-well':
-            return 6
-        elif self.grouptype == '6-well':
-            return 3
+        return _GROUPING_SPEC[self.grouptype][1]
 
     blocksize = Property(depends_on='grouptype')
 
     def _get_blocksize(self):
-        if self.grouptype == '96-well':
-            return 96 / 96
-        elif self.grouptype == '24-well':
-            return 96 / 24
-        elif self.grouptype == '6-well':
-            return 96 / 6
+        return _GROUPING_SPEC[self.grouptype][2]
 
 
 class LEDColumn(ObjectColumn):
@@ -269,13 +296,27 @@ led_table = TableEditor(
 
 
 class PlateConfigHandler(Handler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # LED names may change several times in a row, e.g. when the LED types
+        # are replaced. Update the LEDs' invalid flags only once for those.
+        self._sync_names_invalid_later = utils.DeferredCall(self.sync_names_invalid)
+
     def init(self, info):
         info.object.selected_led = info.object.led_types[0]
         return True
 
     def object__led_types_changed_changed(self, info):
+        self._sync_names_invalid_later(info)
+
+    def sync_names_invalid(self, info):
+        """ Mark LED types as invalid if their names are not unique. """
+        names_invalid = info.object.led_types_names_invalid
         for led_type in info.object.led_types:
-            led_type.name_invalid = info.object.led_types_names_invalid
+            # Only write changes, to avoid needless `invalid` recomputation
+            # and table redraws.
+            if led_type.name_invalid != names_invalid:
+                led_type.name_invalid = names_invalid
 
     def close(self, info, is_ok):
         if is_ok and info.object.invalid:
@@ -352,12 +393,17 @@ class PlateConfig(HasTraits):
     def fire__led_types_changed(self):
         self._led_types_changed = True
 
-    led_types_names_invalid = Property(depends_on='led_types[]')
+    led_types_names_invalid = Property(depends_on='led_types.name')
 
+    @cached_property
     def _get_led_types_names_invalid(self):
         """ LED types must have a unique name. """
-        names = [led_type.name for led_type in self.led_types]
-        return len(names) != len(set(names))
+        seen = set()
+        for led_type in self.led_types:
+            if led_type.name in seen:
+                return True
+            seen.add(led_type.name)
+        return False
 
     conversion_factors = Property(Dict, depends_on='led_types.conversion_factor')
 
@@ -438,7 +484,14 @@ class WellLED(HasTraits):
 
     led_type = Property
 
+    # The resolved LED type, cached to avoid looking it up via the well and
+    # plate on each access. Set on creation and refreshed by the plate when
+    # its configuration changes.
+    _led_type = Any
+
     def _get_led_type(self):
+        if self._led_type is not None:
+            return self._led_type
         return self.well.led_types[self.led_type_idx]
 
     name = Delegate('led_type')
@@ -456,14 +509,11 @@ class WellLED(HasTraits):
 
     def _unassociate_cur_prog(self):
         if self.program:
-            try:
-                self.program.assigned_leds.remove(self)
-            except ValueError:
-                pass
+            self.program.assigned_leds.discard(self)
 
     def assign_program(self, program):
         self._unassociate_cur_prog()
-        program.assigned_leds.append(self)
+        program.assigned_leds.add(self)
         self.program = program
 
     def unassign_program(self):
@@ -490,7 +540,9 @@ class Well(HasTraits):
     pos_col = Int
 
     def _leds_default(self):
-        return [WellLED(led_type_idx=idx, well=self) for idx in range(len(self.led_types))]
+        return [
+            WellLED(led_type_idx=idx, well=self, _led_type=led_type)
+            for idx, led_type in enumerate(self.led_types)]
 
     def as_list(self):
         """ Representation for dumping to JSON """
@@ -523,6 +575,18 @@ class WellGroup(HasTraits):
     def _get_leds(self):
         return self.wells[0].leds
 
+    # Description of the assigned programs, and the plate's label revision it
+    # was created for.
+    _label = Any
+
+    def label(self):
+        """ Return a description of the programs assigned to the LEDs. """
+        revision = self.plate._label_revision
+        if self._label is None or self._label[0] != revision:
+            text = '\n'.join('%s: %s' % (led.name, led.program) for led in self.leds)
+            self._label = (revision, text)
+        return self._label[1]
+
     def assign_program(self, led_n, program):
         for well in self.wells:
             well.assign_program(led_n, program)
@@ -552,12 +616,7 @@ class PlateRowColumn(ObjectColumn):
         return str(int(self.name) + 1)
 
     def get_value(self, object):
-        well = self.get_object(object).wells[0]
-        led_programs = []
-        for led in well.leds:
-            # led_programs = ['Well %s' % well.index]
-            led_programs.append('%s: %s' % (led.name, led.program))
-        return '\n'.join(led_programs)
+        return self.get_object(object).label()
 
     def get_cell_color(self, object):
         well_group = self.get_object(object)
@@ -581,6 +640,28 @@ class PlateRowColumn(ObjectColumn):
         return menu
 
 
+# TableEditors for the plate, by number of columns. Editors only depend on the
+# grouping, of which there are few, and can be shared between plates.
+_plate_editors = {}
+
+
+def plate_editor(ncols):
+    """ Return the TableEditor for a plate with `ncols` columns. """
+    if ncols not in _plate_editors:
+        _plate_editors[ncols] = TableEditor(
+            columns=[PlateRowColumn(name=str(i)) for i in range(ncols)],
+            sortable=False,
+            reorderable=False,
+            deletable=False,
+            editable=False,
+            selection_mode='cells',
+            show_row_labels=True,
+            selected='selected',
+            cell_font="8",
+        )
+    return _plate_editors[ncols]
+
+
 class PlateHandler(Handler):
     def object_updated_changed(self, info):
         """ Redraw the table on changes. """
@@ -608,7 +689,7 @@ class PlateHandler(Handler):
         return True
 
     def confirm_program_clear(self, well):
-        if any([led.program for led in well.leds]):
+        if any(led.program is not None for led in well.leds):
             msg_base = 'The following programs are assigned to well {well}:'
             msg = [msg_base.format(well=well.position)]
             for led in well.leds:
@@ -645,19 +726,9 @@ class Plate(utils.Updateable):
 
     editor = Property(Instance(TableEditor), depends_on='config.grouping')
 
+    @cached_property
     def _get_editor(self):
-        editor = TableEditor(
-            columns=[PlateRowColumn(name=str(i)) for i in range(len(self.plate_rows[0]))],
-            sortable=False,
-            reorderable=False,
-            deletable=False,
-            editable=False,
-            selection_mode='cells',
-            show_row_labels=True,
-            selected='selected',
-            cell_font="8",
-        )
-        return editor
+        return plate_editor(self.ncols)
 
     wells = List(Well, resettable=True)
 
@@ -673,21 +744,23 @@ class Plate(utils.Updateable):
 
     @cached_property
     def _get_well_groups(self):
-        sidelen = math.sqrt(self.config.grouping.blocksize)
+        blocksize = self.config.grouping.blocksize
+        sidelen = math.sqrt(blocksize)
         if not sidelen.is_integer():
-            raise ValueError('Grouping into %d groups is unsupported.' % n_groups)
+            raise ValueError('Grouping into blocks of %d wells is unsupported.' % blocksize)
 
-        n_groups = int(96 / self.config.grouping.blocksize)
         sidelen = int(sidelen)
-        groups_per_row = 12 // sidelen
+        wells = np.empty(len(self.wells), dtype=object)
+        wells[:] = self.wells
+        # Split the 8x12 plate into sidelen x sidelen blocks. Each row of
+        # `blocks` holds the wells of one group, in row-major order.
+        blocks = wells.reshape(8 // sidelen, sidelen, 12 // sidelen, sidelen)
+        blocks = blocks.swapaxes(1, 2).reshape(-1, sidelen * sidelen)
         well_groups = []
-        for i in range(n_groups):
-            row = i // groups_per_row
-            start = i * (sidelen) + row * 12 * (sidelen - 1)
-            idcs = [start + c + r * 12 for r in range(sidelen) for c in range(sidelen)]
+        for i, block in enumerate(blocks):
             well_group = WellGroup(plate=self)
             well_group.position = utils.idx2well(i, self.nrows, self.ncols)
-            well_group.wells = [self.wells[idx] for idx in idcs]
+            well_group.wells = block.tolist()
             well_groups.append(well_group)
         return well_groups
 
@@ -732,20 +805,20 @@ class Plate(utils.Updateable):
 
     @cached_property
     def _get_plate_rows(self):
-        sidelen = math.sqrt(self.config.grouping.blocksize)
-        groups_per_row = int(12 / sidelen)
-        n_rows = int(len(self.well_groups) / groups_per_row)
-        rows = []
-        for i in range(n_rows):
-            cols = self.well_groups[i * groups_per_row:i * groups_per_row + groups_per_row]
-            rows.append(PlateRow(columns=cols))
-        return rows
+        well_groups = np.empty(len(self.well_groups), dtype=object)
+        well_groups[:] = self.well_groups
+        well_groups = well_groups.reshape(self.nrows, self.ncols)
+        return [PlateRow(columns=row.tolist()) for row in well_groups]
 
     # Event to indicate to the handler a redraw of the Table is necessary.
     updated = Event
 
+    # Incremented whenever the well group labels may have changed.
+    _label_revision = Int
+
     @on_trait_change('config, wells.leds, wells.leds.program, wells.leds.program.name')
     def _fire_updated(self):
+        self._label_revision += 1
         self.fire('updated')
 
     # Event to indicate that the size requirement on the Arduino changed.
@@ -753,7 +826,31 @@ class Plate(utils.Updateable):
 
     @on_trait_change('wells:leds:program, led_types')
     def fire_size_update(self, obj, trait, old, new):
-        self.size_update = True
+        self.fire('size_update')
+
+    # Number of LEDs each Program is assigned to, for Programs assigned to at
+    # least one LED of the plate.
+    _assigned_programs = Dict(resettable=True)
+
+    # '.' links, so replacing the wells or LEDs notifies as well.
+    @on_trait_change('wells.leds.program')
+    def _count_assigned_programs(self, obj, trait, old, new):
+        if trait != 'program':
+            # Wells or LEDs were replaced: count from scratch.
+            counts = {}
+            for well in self.wells:
+                for led in well.leds:
+                    if led.program is not None:
+                        counts[led.program] = counts.get(led.program, 0) + 1
+            self._assigned_programs = counts
+            return
+
+        if old is not None:
+            self._assigned_programs[old] -= 1
+            if self._assigned_programs[old] == 0:
+                del self._assigned_programs[old]
+        if new is not None:
+            self._assigned_programs[new] = self._assigned_programs.get(new, 0) + 1
 
     def default_traits_view(self):
         return View(
@@ -772,22 +869,45 @@ class Plate(utils.Updateable):
             Program to assign
         """
         self.start_update('updated')
-        for well in self.selected_wells:
-            well.assign_program(to_led, program)
+        self.start_update('size_update')
+        leds = [well.leds[to_led] for well in self.selected_wells]
+        for led in leds:
+            led._unassociate_cur_prog()
+            led.program = program
+        # Register all LEDs with the program at once, instead of one by one.
+        program.assigned_leds.update(leds)
+        self.stop_update('size_update')
         self.stop_update('updated')
 
     def clear_programs(self, wells):
         """ Remove assigned programs from specified wells. """
         self.start_update('updated')
+        self.start_update('size_update')
+        cleared = {}
         for well in wells:
             for led in well.leds:
-                led.unassign_program()
+                if led.program is not None:
+                    cleared.setdefault(led.program, set()).add(led)
+                    led.program = None
+        # Update the assigned LEDs of each affected program only once.
+        for program, leds in cleared.items():
+            program.assigned_leds.difference_update(leds)
+        self.stop_update('size_update')
         self.stop_update('updated')
 
     def clear_selected(self):
         """ Remove assigned programs from selected wells. """
         self.clear_programs(self.selected_wells)
 
+    def _config_changed(self):
+        # Runs before the listeners below, which may already redraw the table.
+        # If the number of LED types changed, the wells are reset anyway.
+        led_types = self.led_types
+        for well in self.wells:
+            for led in well.leds:
+                if led.led_type_idx < len(led_types):
+                    led._led_type = led_types[led.led_type_idx]
+
     @on_trait_change('config')
     def config_changed(self, obj, trait, old, new):
         # Grouping of wells or number of LEDs changed: complete reset
@@ -805,14 +925,9 @@ class Plate(utils.Updateable):
         Return time in ms after which all programs assigned to an LED of the
         plate are done.
         """
-        done_after = 0
-        for well in self.wells:
-            for led in well.leds:
-                if led.program is None:
-                    continue
-                else:
-                    done_after = max(done_after, led.program.total_duration)
-        return done_after
+        return max(
+            (program.total_duration for program in self._assigned_programs),
+            default=0)
 
 
 # Deferred from Well definition due to mutual dependency
@@ -844,14 +959,13 @@ class WellProgramsViewer(AWellProgramsViewer):
 
     @cached_property
     def _get_colors(self):
-        colors = []
-        for led in self.well.leds:
-            if led.program is not None:
-                prg_colors = [utils.qt_color_to_rgb(led.led_type.color)]
-                # Repeat the color for each step
-                prg_colors = prg_colors * len(led.program.steps)
-                colors = colors + prg_colors
-        return colors
+        leds = [led for led in self.well.leds if led.program is not None]
+        if not leds:
+            return []
+        led_colors = np.array([led.led_type.rgb for led in leds])
+        # Repeat the color for each step
+        n_steps = [len(led.program.steps) for led in leds]
+        return np.repeat(led_colors, n_steps, axis=0).tolist()
 
     # matplotlib patches to use for the legend
     legend = Either(List, None)
@@ -870,7 +984,7 @@ class WellProgramsViewer(AWellProgramsViewer):
                 # LEDs. In that case, force one.
                 self.programs = []
             self.programs = programs
-        self.plot.axes.set_title(self.title)
+        self.set_plot_title()
         self.update_legend()
 
     def led_legend(self, led):
@@ -885,7 +999,7 @@ class WellProgramsViewer(AWellProgramsViewer):
             label = label % (led.program.name, led.program._after_end)
         patch = mpl.lines.Line2D(
             [], [],
-            color=utils.qt_color_to_rgb(led.led_type.color),
+            color=led.led_type.rgb,
             label=label)
         return patch
 
@@ -901,12 +1015,11 @@ class WellProgramsViewer(AWellProgramsViewer):
         self.legend = legend
         self.plot.draw()
 
-    title = Property(depends_on='well, programs.name')
+    title = Property(depends_on='well, _program_names[]')
 
     @cached_property
     def _get_title(self):
-        names = [program.name for program in self.programs]
-        title = ', '.join(names)
+        title = ', '.join(self._program_names)
         title = self.well.position + '\n' + title
         return title
 
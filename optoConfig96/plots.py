@@ -22,6 +22,7 @@ Functionality to display plots of Steps and programs.
 
 from .ui import *
 
+import matplotlib as mpl
 from matplotlib.axes import Axes
 from matplotlib.figure import Figure
 from matplotlib.lines import Line2D
@@ -32,6 +33,54 @@ import numpy as np
 from . import utils
 
 
+# Long pulse trains produce lines with many vertices. Simplify them more
+# aggressively and render them in chunks.
+mpl.rcParams['path.simplify'] = True
+mpl.rcParams['path.simplify_threshold'] = 1.0
+mpl.rcParams['agg.path.chunksize'] = 10000
+
+
+# Tick labels of plate rows and columns
+_ROWS = list('ABCDEFGHIJKLMNOP')
+_COLS = [str(i) for i in range(1, 25)]
+
+# Colors of heatmap annotations on dark (< 0.5) and light cells
+_ANNOTATION_COLORS = np.array(['white', 'black'])
+
+
+def _maximum(array):
+    """
+    Return the maximum of `array`, or -inf if it is empty.
+
+    Empty arrays thus never determine the maximum of several arrays.
+    """
+    return float(np.max(array)) if np.size(array) else -np.inf
+
+
+def _maxima(arrays):
+    """
+    Return the maximum of each array in `arrays`, as `_maximum` does.
+
+    All non-empty arrays are reduced in a single pass over their
+    concatenation.
+    """
+    maxima = np.full(len(arrays), -np.inf)
+    lengths = np.array([len(a) for a in arrays], dtype=int)
+    nonempty = lengths > 0
+    if nonempty.any():
+        # reduceat cannot handle empty segments. Empty arrays add nothing to
+        # the concatenation, so the non-empty ones start at these offsets.
+        offsets = np.cumsum(lengths[nonempty]) - lengths[nonempty]
+        maxima[nonempty] = np.maximum.reduceat(np.concatenate(arrays), offsets)
+    return maxima
+
+
+def _overall_maximum(maxima):
+    """ Return the largest of the per-array `maxima`, or 1 if all are empty. """
+    maximum = maxima.max() if maxima.size else -np.inf
+    return maximum if np.isfinite(maximum) else 1
+
+
 class StepPlotHandler(Handler):
     def object_xlimits_updated_changed(self, info):
         """ Update selectable display range when Step settings change. """
@@ -51,27 +100,38 @@ class StepPlot(utils.Updateable):
 
     _is_updating = Bool(False)
 
-    xdata = List(Instance(np.ndarray, [np.array((0, 1))]))
-    xdata_max = Property(depends_on='xdata, xdata[]')
+    # List of x data arrays, one per line. A plain list, because traits
+    # validation of each array is not needed when updating single lines.
+    xdata = Any
+    # Updated by `set_xydata` and `update_xydata`
+    xdata_max = Float(1.0)
 
-    @cached_property
-    def _get_xdata_max(self):
-        try:
-            return max(np.max(xdata) for xdata in self.xdata)
-        except ValueError:
-            return 1
+    # Maxima of the individual arrays in `xdata`, so that updating a single
+    # line does not require scanning all of them.
+    _xmax_cache = Array(dtype=np.float64, value=np.array([1.0]))
+
+    def _xdata_default(self):
+        return [np.array((0, 1))]
 
     xunit = Enum(*utils.TIME_FACTORS.keys())
 
-    ydata = List(Instance(np.ndarray, [np.array((0, 1))]))
-    ydata_max = Property(depends_on='ydata, ydata[]')
+    # Reciprocal of the factor for `xunit`, to convert by multiplication.
+    _xunit_inv_factor = Property(depends_on='xunit')
 
     @cached_property
-    def _get_ydata_max(self):
-        try:
-            return max(np.max(ydata) for ydata in self.ydata)
-        except ValueError:
-            return 1
+    def _get__xunit_inv_factor(self):
+        return 1 / utils.TIME_FACTORS[self.xunit]
+
+    # List of y data arrays, one per line.
+    ydata = Any
+    # Updated by `set_xydata` and `update_xydata`
+    ydata_max = Float(1.0)
+
+    # Maxima of the individual arrays in `ydata`
+    _ymax_cache = Array(dtype=np.float64, value=np.array([1.0]))
+
+    def _ydata_default(self):
+        return [np.array((0, 1))]
 
     xlimits = Range(0.0, 2**32 - 1)
 
@@ -91,14 +151,16 @@ class StepPlot(utils.Updateable):
         self.axes = self.figure.add_subplot(111)
         self.axes.set_ylabel('Intensity / a.u.')
         self.axes.set_xlabel('Time / %s' % self.xunit)
-        self.axes.ticklabel_format(scilimits=(-4, 4), useMathText=True)
+        self.axes.ticklabel_format(scilimits=(-4, 4), useMathText=False)
         self.arrow_right = None
         self.arrow_left = None
 
         self._xminmaxdisablelistener = False
+        self._draw_later = utils.DeferredCall(self._draw_canvas)
+        self._set_xlim_later = utils.DeferredCall(self._apply_xlim, delay=16)
 
     def ms_to_unit(self, values):
-        return values / utils.TIME_FACTORS[self.xunit]
+        return values * self._xunit_inv_factor
 
     def pltdata(self, n):
         xdata_plt = self.ms_to_unit(self.xdata[n])
@@ -107,19 +169,30 @@ class StepPlot(utils.Updateable):
 
     def set_xydata(self, xdatas=None, ydatas=None):
         if xdatas is not None:
-            self.xdata = utils.ensure_iterable(xdatas)
+            xdatas = list(utils.ensure_iterable(xdatas))
+            self._xmax_cache = _maxima(xdatas)
+            self.xdata = xdatas
 
         if ydatas is not None:
-            self.ydata = utils.ensure_iterable(ydatas)
+            ydatas = list(utils.ensure_iterable(ydatas))
+            self._ymax_cache = _maxima(ydatas)
+            self.ydata = ydatas
 
-        for line in self.lines:
-            line.remove()
+        self._update_maxima()
 
-        self.lines = []
+        if len(self.lines) == len(self.xdata):
+            # Reuse the existing lines if only their data changed
+            for n in range(len(self.xdata)):
+                self.draw_line(n)
+        else:
+            for line in self.lines:
+                line.remove()
 
-        for n in range(len(self.xdata)):
-            x, y = self.pltdata(n)
-            self.lines.append(self.axes.step(x, y, where='post')[0])
+            self.lines = []
+
+            for n in range(len(self.xdata)):
+                x, y = self.pltdata(n)
+                self.lines.append(self.axes.step(x, y, where='post')[0])
 
         self.axes.set_xlabel('Time / %s' % self.xunit)
         self.update_limits()
@@ -127,17 +200,30 @@ class StepPlot(utils.Updateable):
 
     def update_xydata(self, n, xdata=None, ydata=None):
         if xdata is not None:
+            self._xmax_cache[n] = _maximum(xdata)
             self.xdata[n] = xdata
             xdata = self.ms_to_unit(xdata)
             self.lines[n].set_xdata(xdata)
 
         if ydata is not None:
+            self._ymax_cache[n] = _maximum(ydata)
             self.ydata[n] = ydata
             self.lines[n].set_ydata(ydata)
 
-        self.update_limits()
+        xdata_max, ydata_max = self.xdata_max, self.ydata_max
+        self._update_maxima()
+        # The limits only depend on the data maxima
+        if not math.isclose(xdata_max, self.xdata_max):
+            self.update_xlimits()
+        if not math.isclose(ydata_max, self.ydata_max):
+            self.update_ylimits()
         self.wait_for_update()
 
+    def _update_maxima(self):
+        """ Update `xdata_max` and `ydata_max` from the per-line maxima. """
+        self.xdata_max = _overall_maximum(self._xmax_cache)
+        self.ydata_max = _overall_maximum(self._ymax_cache)
+
     def draw_line(self, n):
         xdata_plt = self.ms_to_unit(self.xdata[n])
         ydata_plt = self.ydata[n]
@@ -162,9 +248,13 @@ class StepPlot(utils.Updateable):
         self.xlimits_max = xlimits_max
         xmax_new = xlimits_max
 
-        # # Reset display limits
+        # Reset display limits. Apply both limits at once instead of once
+        # per changed trait.
+        self._xminmaxdisablelistener = True
         self._xmin = 0
         self._xmax = min(xmax_new, xlimits_max)
+        self._xminmaxdisablelistener = False
+        self.set_xlim()
 
     def update_ylimits(self):
         self.set_ylim(0, max(1, self.ydata_max * 1.1))
@@ -177,11 +267,14 @@ class StepPlot(utils.Updateable):
     def _set_xlim(self):
         if self._xminmaxdisablelistener:
             return
-        else:
-            self._xminmaxdisablelistener = True
+        # Limits change continuously while the range slider is dragged. Apply
+        # them at most once per frame.
+        self._set_xlim_later()
+
+    def _apply_xlim(self):
+        self._xminmaxdisablelistener = True
         self.set_xlim()
         self._xminmaxdisablelistener = False
-        # Set xlimits immediately without waiting
         self.draw()
 
     def set_xlim(self, xmin=None, xmax=None):
@@ -220,23 +313,28 @@ class StepPlot(utils.Updateable):
         xmin, xmax = self._xmin, self._xmax
         xdata_max = self.ms_to_unit(self.xdata_max)
 
-        # remove existing arrows
-        if self.arrow_right:
-            self.arrow_right.remove()
-            self.arrow_right = None
-
-        if self.arrow_left:
-            self.arrow_left.remove()
-            self.arrow_left = None
+        # show arrows if data range exceeds limits
+        self.arrow_right = self.update_exceed_arrow(
+            self.arrow_right, 'right', xmax < xdata_max)
+        self.arrow_left = self.update_exceed_arrow(
+            self.arrow_left, 'left', xmin > 0)
 
-        # draw new arrow if data range exceeds limits
-        if xmax < xdata_max:
-            self.arrow_right = self.exceed_arrow(direction='right')
+    def update_exceed_arrow(self, arrow, direction, visible):
+        """
+        Show or hide an arrow created by `exceed_arrow`. The arrow is created
+        when it is first shown and reused afterwards.
 
-        if xmin > 0:
-            self.arrow_left = self.exceed_arrow(direction='left')
+        Returns
+        -------
+        arrow : FancyArrow or None
+        """
+        if visible:
+            arrow = self.exceed_arrow(direction, arrow)
+        if arrow is not None:
+            arrow.set_visible(visible)
+        return arrow
 
-    def exceed_arrow(self, direction):
+    def exceed_arrow(self, direction, arrow=None):
         """
         Return a FancyArrow to indicate that the data range exceeds the axis
         limits.
@@ -247,6 +345,9 @@ class StepPlot(utils.Updateable):
         direction : str, either `right` or `left`
             Direction of the arrow.
 
+        arrow : FancyArrow, optional
+            Existing arrow to move instead of creating a new one.
+
         Returns
         -------
         arrow : FancyArrow
@@ -265,12 +366,17 @@ class StepPlot(utils.Updateable):
             xstart = xmin + 0.1 * x_range
             length *= -1
 
-        arrow = self.axes.arrow(
-            xstart, 0.95 * ymax,  # start
-            length, 0,   # length
-            width=0.01 * y_range, color='red',
-            head_width=0.03 * y_range, head_length=0.05 * x_range,
-            length_includes_head=True)
+        geometry = dict(
+            x=xstart, y=0.95 * ymax,  # start
+            dx=length, dy=0,  # length
+            width=0.01 * y_range,
+            head_width=0.03 * y_range, head_length=0.05 * x_range)
+
+        if arrow is None:
+            arrow = self.axes.arrow(
+                color='red', length_includes_head=True, **geometry)
+        else:
+            arrow.set_data(**geometry)
         return arrow
 
     def wait_for_update(self):
@@ -278,9 +384,16 @@ class StepPlot(utils.Updateable):
             self.draw()
 
     def draw(self):
+        """
+        Request a redraw of the canvas. Requests made before control returns
+        to the event loop are merged into one.
+        """
+        self._is_updating = False
+        self._draw_later()
+
+    def _draw_canvas(self):
         try:
             self.figure.canvas.draw()
-            self._is_updating = False
         except RuntimeError:
             # If a draw update is requested from a plot object which is no
             # longer shown in the GUI, but which has not been garbage collected
@@ -312,19 +425,16 @@ class ArrayHeatmap(HasTraits):
         axis = figure.add_subplot(111)
         axis.set_yticks(np.arange(self.array.shape[0]))
         axis.set_xticks(np.arange(self.array.shape[1]))
-        axis.set_yticklabels('ABCDEFGH')
-        axis.set_xticklabels(np.arange(self.array.shape[1]) + 1)
+        axis.set_yticklabels(_ROWS[:self.array.shape[0]])
+        axis.set_xticklabels(_COLS[:self.array.shape[1]])
         axis.set_title(self.title)
         axis.tick_params(top=True, labeltop=True)
+        rounded = np.round(self.array, 2)
+        colors = _ANNOTATION_COLORS[(self.array >= 0.5).astype(np.intp)]
         for idx_y, idx_x in np.ndindex(*self.array.shape):
-            value = self.array[idx_y, idx_x]
-            if value < 0.5:
-                color = 'white'
-            else:
-                color = 'black'
             axis.text(
-                idx_x, idx_y, np.round(value, 2),
-                ha='center', va='center', color=color)
+                idx_x, idx_y, rounded[idx_y, idx_x],
+                ha='center', va='center', color=colors[idx_y, idx_x])
         heatmap = axis.imshow(self.array, cmap='Greys_r', vmin=0, vmax=1)
         cbar = figure.colorbar(heatmap, fraction=0.031, pad=0.04)
         cbar.ax.set_ylabel('Correction Factor', rotation=-90, va='bottom')
@@ -24,6 +24,10 @@ from .ui import *
 from traitsui.menu import Menu, Action
 from traitsui.table_column import ObjectColumn
 
+import bisect
+import collections
+import contextlib
+import itertools
 import numpy as np
 
 from . import utils
@@ -34,9 +38,16 @@ from .steps import StepColumn
 
 
 ProgramDeleteWarning = utils.ConfirmationDialog()
+ProgramDeleteManyWarning = utils.ConfirmationDialog()
 ProgramDeleteAllWarning = utils.ConfirmationDialog()
 
 
+# Names of the traits a StepInProgram delegates, by Step class. Every instance
+# of a Step class has the same traits, including those added in
+# `_sync_internals`.
+_DELEGATED_NAMES = {}
+
+
 class StepInProgram(AStep):
     """ A container for a Step in a Program.
 
@@ -50,17 +61,25 @@ class StepInProgram(AStep):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # __getattr__ and __setattr__ require _delegated
-        # Setting it by doing self._delegated = [] results in infinite recursion
-        super().__setattr__('_delegated', [])
-
-        for trait_type in ('trait', 'property', 'event'):
-            for trait_name in self.step.trait_names(type=trait_type):
-                self.add_trait(trait_name, Delegate('step'))
-                self._delegated.append(trait_name)
+        # Setting it by doing self._delegated = ... results in infinite recursion
+        super().__setattr__('_delegated', frozenset())
+
+        step_class = type(self.step)
+        delegated = _DELEGATED_NAMES.get(step_class)
+        if delegated is None:
+            delegated = frozenset(
+                trait_name
+                for trait_type in ('trait', 'property', 'event')
+                for trait_name in self.step.trait_names(type=trait_type))
+            _DELEGATED_NAMES[step_class] = delegated
+        for trait_name in delegated:
+            self.add_trait(trait_name, Delegate('step'))
+        super().__setattr__('_delegated', delegated)
 
     def __getattr__(self, name):
         if name not in self._delegated:
             return getattr(self.step, name)
+        raise AttributeError(name)
 
     def __setattr__(self, name, value):
         if name in self._delegated:
@@ -144,19 +163,50 @@ class Program(utils.Counted, utils.Updateable):
     # The unique Steps which make up this Program.
     _unique_steps = Property(List, depends_on='steps')
 
-    # The total duration of this Program's steps.
-    total_duration = Property(Int, depends_on='steps.step.duration')
+    # The total duration of this Program's steps. Updated incrementally when
+    # Step durations change.
+    total_duration = Int
 
-    @cached_property
-    def _get_total_duration(self):
-        return sum([step.duration for step in self.steps])
+    # The Steps whose durations are tracked, and how often they occur, by id.
+    _duration_steps = Dict
+    _duration_counts = Dict
+
+    @on_trait_change('steps[]')
+    def _update_total_duration(self):
+        """ Recompute the total duration when Steps are added or removed. """
+        steps = {}
+        counts = collections.Counter()
+        for step_in_program in self.steps:
+            step = step_in_program.step
+            steps[id(step)] = step
+            counts[id(step)] += 1
+
+        # Listen to each Step directly. An extended 'steps:step:duration'
+        # listener stops notifying for a Step as soon as one of several
+        # occurrences is removed.
+        for step_id, step in self._duration_steps.items():
+            if step_id not in steps:
+                step.on_trait_change(self._shift_total_duration, 'duration', remove=True)
+        for step_id, step in steps.items():
+            if step_id not in self._duration_steps:
+                step.on_trait_change(self._shift_total_duration, 'duration')
+
+        self._duration_steps = steps
+        self._duration_counts = counts
+        self.total_duration = sum(step.duration for step in self.steps)
+
+    def _shift_total_duration(self, step, name, old, new):
+        """ Apply the duration change of a single Step to the total. """
+        self.total_duration += (new - old) * self._duration_counts[id(step)]
 
     @cached_property
     def _get__unique_steps(self):
         unique_steps = []
+        seen = set()
         for step_in_program in self.steps:
             step = step_in_program.step
-            if step not in unique_steps:
+            if id(step) not in seen:
+                seen.add(id(step))
                 unique_steps.append(step)
         return unique_steps
 
@@ -193,11 +243,7 @@ class Program(utils.Counted, utils.Updateable):
     def _get_has_invalid_steps(self):
         """ Are any steps in the program invalid?
         """
-        for step in self._unique_steps:
-            if step.invalid:
-                return True
-
-        return False
+        return any(step.invalid for step in self._unique_steps)
 
     def invalid_reasons(self):
         if not self.invalid:
@@ -221,7 +267,8 @@ class Program(utils.Counted, utils.Updateable):
     # The indices of the Steps selected by the user.
     selected_indices = Any
 
-    assigned_leds = List([])  # TODO: Clean solution to circular dependencies
+    # LEDs this Program is assigned to. Unordered, for fast removal.
+    assigned_leds = Set()  # TODO: Clean solution to circular dependencies
 
     # Is this program used in the final Arduino Code?
     is_used = Property
@@ -249,8 +296,18 @@ class Program(utils.Counted, utils.Updateable):
     # Event to indicate any parameter changes
     dirtied = Event
 
+    # Parameters which set the dirty flag. In-place changes of `steps` are
+    # signalled by `steps_updated`.
+    _dirty_params = frozenset((
+            'name',
+            'after_end_display',
+            'steps',
+            'steps_updated'
+        ))
+
     def __setattr__(self, name, value):
-        super().__setattr__('dirtied', True)
+        if name in self._dirty_params:
+            super().__setattr__('dirtied', True)
         super().__setattr__(name, value)
 
     # --------------------------------------------------------------------------
@@ -309,10 +366,10 @@ class Program(utils.Counted, utils.Updateable):
         self.start_update('steps_updated')
         try:
             # multiple steps
-            new_steps = []
-            for step in steps:
-                new_steps.append(self._prepare_step(step))
-            self.steps += new_steps
+            new_steps = [self._prepare_step(step) for step in steps]
+            # `+=` would notify once for the new items and again for
+            # re-assigning the list
+            self.steps.extend(new_steps)
         except TypeError:
             # one step
             self.add_step(steps)
@@ -334,12 +391,14 @@ class Program(utils.Counted, utils.Updateable):
         """ Remove one or multiple StepInPrograms from the program. """
         self.start_update('steps_updated')
         steps = utils.ensure_iterable(steps)
-        steps_to_remove = [step for step in steps]
-        new_steps = [step for step in self.steps if step not in steps_to_remove]
+        steps_to_remove = list(steps)
+        remove_ids = {id(step) for step in steps_to_remove}
+        new_steps = [step for step in self.steps if id(step) not in remove_ids]
         # Update list only once to prevent repeated redraws of the step table
         self.steps = new_steps
+        remaining_ids = {id(step.step) for step in new_steps}
         for step_to_remove in steps_to_remove:
-            if step_to_remove.step not in self._unique_steps:
+            if id(step_to_remove.step) not in remaining_ids:
                 self._unregister_step(step_to_remove)
         self.selected = []
         self.stop_update('steps_updated')
@@ -354,12 +413,12 @@ class Program(utils.Counted, utils.Updateable):
 
     def delete(self):
         """ Free up the used ID und unregister the program from any LEDs. """
-        self.remove_steps(self.steps)
+        self.remove_steps(self.steps[:])
         self.start_update('steps_updated')
         self.counter.free(self.ID)
         for led in self.assigned_leds:
             led.program = None
-        self.assigned_leds = []
+        self.assigned_leds = set()
         self.stop_update('steps_updated')
 
     def duplicate(self):
@@ -414,12 +473,43 @@ class ProgramPlotData(HasTraits):
     def _get_colors(self):
         return [step._color for step in self.program.steps]
 
+    # Cached X and Y values for individual steps, ignoring their position in the
+    # program. Entries which are None are recomputed when they are requested.
+    # The viewer invalidates them before updating the plot.
+    _xs_cache = List
+    _ys_cache = List
+
+    def invalidate(self):
+        """ Recompute the plot data of all steps when it is next requested. """
+        n_steps = len(self.program.steps)
+        self._xs_cache = [None] * n_steps
+        self._ys_cache = [None] * n_steps
+
+    def invalidate_step(self, step_id):
+        """ Recompute the plot data of a single step when it is next requested. """
+        if len(self._xs_cache) != len(self.program.steps):
+            self.invalidate()
+            return
+        for step_n, step in enumerate(self.program.steps):
+            if step.ID == step_id:
+                self._xs_cache[step_n] = None
+                self._ys_cache[step_n] = None
+
+    def _update_cache(self):
+        """ Compute the plot data of all invalidated steps. """
+        if len(self._xs_cache) != len(self.program.steps):
+            self.invalidate()
+        for step_n, step_xs in enumerate(self._xs_cache):
+            if step_xs is None:
+                self._xs_cache[step_n] = self.xs_for_step(step_n)
+                self._ys_cache[step_n] = self.ys_for_step(step_n)
+
     # X values for individual steps, ignoring their position in the program.
-    _xs = Property(depends_on='viewer.plot_update, viewer.plot_redraw')
+    _xs = Property
 
-    @cached_property
     def _get__xs(self):
-        return [self.xs_for_step(step_n) for step_n in range(len(self.program.steps))]
+        self._update_cache()
+        return self._xs_cache
 
     # X values for individual steps, taking into consideration their position in
     # the program and their start time.
@@ -427,17 +517,21 @@ class ProgramPlotData(HasTraits):
 
     @cached_property
     def _get_xs(self):
-        xs = []
-        n_steps = len(self.program.steps)
-        for step_n in range(n_steps):
-            step_xs = self._xs[step_n].copy()
-            # Add data point at the start to continue line from the previous step
-            if step_n > 0:
-                step_xs = np.append(step_xs[0], step_xs)
-                step_start = sum(step.duration for step in self.program.steps[:step_n])
-                step_xs += step_start
-            xs.append(step_xs)
-        return xs
+        steps = self.program.steps
+        if not steps:
+            return []
+        step_xs = self._xs
+        # Add data point at the start to continue line from the previous step
+        parts = [step_xs[0]]
+        for xs in step_xs[1:]:
+            parts += [xs[:1], xs]
+        lengths = [len(step_xs[0])] + [len(xs) + 1 for xs in step_xs[1:]]
+
+        # Shift all steps by their start times at once
+        starts = np.cumsum([0] + [step.duration for step in steps[:-1]])
+        xs = np.concatenate(parts)
+        xs += np.repeat(starts, lengths)
+        return np.split(xs, np.cumsum(lengths)[:-1])
 
     def xs_for_step(self, step_n):
         """ Return X values for plotting a Step in the Program.
@@ -457,26 +551,25 @@ class ProgramPlotData(HasTraits):
 
         return xs
 
-    _ys = Property(depends_on='viewer.plot_update, viewer.plot_redraw')
+    _ys = Property
 
-    @cached_property
     def _get__ys(self):
-        return [self.ys_for_step(step_n) for step_n in range(len(self.program.steps))]
+        self._update_cache()
+        return self._ys_cache
 
     ys = Property(depends_on='viewer.plot_update, viewer.plot_redraw')
 
     @cached_property
     def _get_ys(self):
-        ys = []
-        n_steps = len(self.program.steps)
-        for step_n in range(n_steps):
-            step_ys = self._ys[step_n]
-            if step_n > 0:
-                # Continue where previous step left off
-                step_ys = np.append(self._ys[step_n - 1][-1], step_ys)
-            ys.append(step_ys)
-
-        return ys
+        step_ys = self._ys
+        if not step_ys:
+            return []
+        # Continue where previous step left off
+        parts = [step_ys[0]]
+        for prev_ys, ys in zip(step_ys, step_ys[1:]):
+            parts += [prev_ys[-1:], ys]
+        lengths = [len(step_ys[0])] + [len(ys) + 1 for ys in step_ys[1:]]
+        return np.split(np.concatenate(parts), np.cumsum(lengths)[:-1])
 
     def ys_for_step(self, step_n):
         """ Return Y values for plotting a Step in the Program.
@@ -528,6 +621,8 @@ class MultiProgramViewer(utils.Updateable):
 
     @on_trait_change('programs:_unique_steps:plot_update, programs:name')
     def _fire_plot_update(self, obj, name, old, new):
+        if name == 'name':
+            self._rename_program(obj, new)
         # Do not fire a plot update while any programs are still updating
         if self.programs and any(program.is_updating('steps_updated') for program in self.programs):
             return
@@ -560,10 +655,7 @@ class MultiProgramViewer(utils.Updateable):
     total_cycles = Property
 
     def _get_total_cycles(self):
-        total_cycles = 0
-        for program in self.programs:
-            total_cycles += sum([step.cycles for step in program.steps])
-        return total_cycles
+        return sum(step.cycles for program in self.programs for step in program.steps)
 
     def _get_show_pulsed(self):
         if self.show_pulsed_display == 'All Steps':
@@ -636,10 +728,9 @@ class MultiProgramViewer(utils.Updateable):
         attribute : str
             A list attribute of `ProgramPlotData`.
         """
-        concat = []
-        for program_plot_data in self.program_plot_datas:
-            concat += getattr(program_plot_data, attribute)
-        return concat
+        return list(itertools.chain.from_iterable(
+            getattr(program_plot_data, attribute)
+            for program_plot_data in self.program_plot_datas))
 
     xs = Property
 
@@ -667,46 +758,99 @@ class MultiProgramViewer(utils.Updateable):
     def _get_colors(self):
         return self.concatenate_from_plotdata('colors')
 
-    title = Property(depends_on='programs.name')
+    # Names of `programs`, in the same order. Renames update single entries.
+    _program_names = List(Str)
+
+    def _programs_changed(self):
+        self._program_names = [program.name for program in self.programs]
+
+    def _programs_items_changed(self):
+        self._programs_changed()
+
+    def _rename_program(self, program, name):
+        for i, other in enumerate(self.programs):
+            if other is program:
+                self._program_names[i] = name
+
+    title = Property(depends_on='_program_names[]')
 
     @cached_property
     def _get_title(self):
-        names = [program.name for program in self.programs]
-        return ', '.join(names)
+        return ', '.join(self._program_names)
+
+    # Lines of each step, by step ID, as returned by `line_indices`. Rebuilt
+    # when the shown steps change.
+    _step_index_map = Any
+
+    def _build_step_index_map(self):
+        step_index_map = {}
+        idx = 0
+        for program in self.programs:
+            n_steps = len(program.steps)
+            for step_n, step in enumerate(program.steps):
+                # If this is not a program's last step, informatin about the
+                # next step is necessary: If y values are updated, this will
+                # otherwise lead to gaps in the plot.
+                nxt = None
+                if step_n < n_steps - 1:
+                    nxt = idx + 1
+                step_index_map.setdefault(step.ID, []).append((idx, nxt))
+                idx += 1
+        return step_index_map
 
     def line_indices(self, step_id):
         """
-        Yield the indices for `xs`, `ys` and `plot.lines` where information
+        Return the indices for `xs`, `ys` and `plot.lines` where information
         about the requested step is stored.
 
         Parameters
         ----------
         step_id : int
             ID of the requested step.
+
+        Returns
+        -------
+        indices : list of (idx, nxt) tuples
+            `nxt` is the index of the subsequent step in the same program, or
+            None if the step is the last one.
         """
-        for prg_n, program in enumerate(self.programs):
-            for step_n, step in enumerate(program.steps):
-                if step.ID == step_id:
-                    start = sum(len(program.steps) for program in self.programs[:prg_n])
-                    idx = start + step_n
-                    # If this is not a program's last step, informatin about the
-                    # next step is necessary: If y values are updated, this will
-                    # otherwise lead to gaps in the plot.
-                    nxt = None
-                    if step_n < len(program.steps) - 1:
-                        nxt = idx + 1
-                    yield (idx, nxt)
+        if step_id is None:
+            return []
+
+        indices = None
+        if self._step_index_map is not None:
+            indices = self._step_index_map.get(step_id)
+        # Step IDs are reassigned when other Steps are deleted. Rebuild the map
+        # if it does not match the shown steps anymore.
+        if not indices or any(
+                getattr(self.step_from_index(idx), 'ID', None) != step_id
+                for idx, nxt in indices):
+            self._program_starts = None
+            self._step_index_map = self._build_step_index_map()
+            indices = self._step_index_map.get(step_id, [])
+        return list(indices)
+
+    # Index of the first step of each program in `xs`, `ys` and `plot.lines`.
+    # Rebuilt when the shown steps change.
+    _program_starts = Any
 
     def step_from_index(self, idx):
         """
         Return the Step object associated with an index for `xs`, `ys` and
         `plot.lines`.
         """
-        for program in self.programs:
-            if idx < len(program.steps):
-                return program.steps[idx]
-            else:
-                idx -= len(program.steps)
+        if self._program_starts is None:
+            # accumulate(initial=0) requires Python 3.8
+            self._program_starts = [0] + list(itertools.accumulate(
+                len(program.steps) for program in self.programs))
+        # Empty programs share their start with the next program; take the last
+        prg_n = bisect.bisect_right(self._program_starts, idx) - 1
+        if prg_n >= len(self.programs):
+            return None
+        program = self.programs[prg_n]
+        step_n = idx - self._program_starts[prg_n]
+        if step_n < len(program.steps):
+            return program.steps[step_n]
 
     @on_trait_change('plot_update, plot_redraw')
     def update_figure(self, obj, name, old, signal):
@@ -717,30 +861,56 @@ class MultiProgramViewer(utils.Updateable):
             if trait == 'duration':
                 self._fire_plot_redraw()
             else:
-                for idx, nxt in self.line_indices(step_id):
-                    self._update_figure(idx, nxt)
+                if step_id is not None:
+                    for program_plot_data in self.program_plot_datas:
+                        program_plot_data.invalidate_step(step_id)
+                self._update_figure(self.line_indices(step_id))
         elif name == 'plot_redraw':
+            self._step_index_map = None
+            self._program_starts = None
+            for program_plot_data in self.program_plot_datas:
+                program_plot_data.invalidate()
             self._redraw_figure()
         else:
-            self._update_figure(idx=None, nxt=None)
-        self.plot.axes.set_title(self.title)
+            self._update_figure(())
+        self.set_plot_title()
         self.plot.draw()
         self.stop_update('drawing', signal=None)
 
-    def _update_figure(self, idx, nxt):
+    def set_plot_title(self):
+        """ Set the title of the plot, if it changed. """
+        title = self.title
+        if title != self.plot.axes.get_title():
+            self.plot.axes.set_title(title)
+
+    def _update_figure(self, indices):
         """
         Update existing figure if individual steps are modified.
+
+        Parameters
+        ----------
+        indices : iterable of (idx, nxt) tuples
+            Line indices of the modified steps, as returned by `line_indices`.
         """
-        if idx is not None:
-            self.plot.update_xydata(idx, self.xs[idx], self.ys[idx])
-            self.plot.lines[idx].set_linestyle(['-', '--'][self.steps_is_pulsed[idx]])
-            self.plot.lines[idx].set_color(self.colors[idx])
+        indices = list(indices)
+        if not indices:
+            return
+
+        # These Properties concatenate the data of all programs; only read
+        # them once.
+        xs, ys = self.xs, self.ys
+        steps_is_pulsed, colors = self.steps_is_pulsed, self.colors
+
+        for idx, nxt in indices:
+            self.plot.update_xydata(idx, xs[idx], ys[idx])
+            self.plot.lines[idx].set_linestyle(['-', '--'][steps_is_pulsed[idx]])
+            self.plot.lines[idx].set_color(colors[idx])
 
             # The subsequent step needs to be informed about changes in the
             # y values to prevent gaps in the plot.
             if nxt:
                 new_y = self.plot.ydata[nxt]
-                new_y[0] = self.ys[idx][-1]
+                new_y[0] = ys[idx][-1]
                 self.plot.update_xydata(nxt, ydata=new_y)
 
     def _redraw_figure(self):
@@ -750,9 +920,11 @@ class MultiProgramViewer(utils.Updateable):
         """
         self.start_update('drawing')
         self.plot.set_xydata(self.xs, self.ys)
-        for idx in self.indices():
-            self.plot.lines[idx].set_linestyle(['-', '--'][self.steps_is_pulsed[idx]])
-            self.plot.lines[idx].set_color(self.colors[idx])
+        # Read the concatenated step properties only once, not once per line
+        lines = zip(self.plot.lines, self.steps_is_pulsed, self.colors)
+        for line, is_pulsed, color in lines:
+            line.set_linestyle(['-', '--'][is_pulsed])
+            line.set_color(color)
         self.stop_update('drawing', signal=None)
 
 
@@ -852,34 +1024,51 @@ class ProgramListHandler(Controller):
         Populate right-click menu to add Program Steps to another Program and
         to assign Programs to Wells.
 
-        Called from the main application handler.
+        Called from the main application handler. The menu is only rebuilt if
+        the Programs or LED types it lists have changed.
         """
-        add_steps_items = []
-        for program in sorted(info.object.programs, key=lambda prg: prg.name):
-            add_steps_items.append(Action(
+        led_types = self.app.plate.led_types
+        menu_key = (
+            tuple((program.ID, program.name) for program in info.object.programs),
+            tuple(led_type.name for led_type in led_types))
+        if menu_key != self._menu_key:
+            self._menu_key = menu_key
+            self._menu = self._build_rightclick_menu(info.object.programs, led_types)
+
+        for column in info.programs.columns:
+            column.menu = self._menu
+
+    # The right-click menu and the Programs and LED types it was built for.
+    _menu = Any
+    _menu_key = Any
+
+    def _build_rightclick_menu(self, programs, led_types):
+        add_steps_items = [
+            Action(
                 name=program.name,
-                action="handler.add_to(info, to_program=%d)" % program.ID))
+                action="handler.add_to(info, to_program=%d)" % program.ID)
+            for program in sorted(programs, key=lambda prg: prg.name)]
 
-        led_assign_items = []
-        led_bulk_assign_items = []
-        for i, led_type in enumerate(self.app.plate.led_types):
-            led_assign_items.append(Action(
+        led_assign_items = [
+            Action(
                 name=led_type.name,
                 action='handler.assign_to(info, to_led=%d)' % i,
-                enabled_when='handler.allow_well_assign(info)'))
-            led_bulk_assign_items.append(Action(
+                enabled_when='handler.allow_well_assign(info)')
+            for i, led_type in enumerate(led_types)]
+        led_bulk_assign_items = [
+            Action(
                 name=led_type.name,
                 action='handler.bulk_assign(info, to_led=%d)' % i,
-                enabled_when='handler.allow_bulk_assign(info)'))
-        for column in info.programs.columns:
-            column.menu = Menu(
-                Action(name='New Program', action='info.object.new_program()'),
-                Action(name='Delete Selected', action='handler.object_delete_changed(info)'),
-                Action(name='Duplicate Selected', action='handler.object_duplicate_changed(info)'),
-                Action(name='Create dark Step with program duration', action='handler.dark_step(info)'),
-                Menu(*add_steps_items, name='Add program steps to ...'),
-                Menu(*led_assign_items, name='Assign Program to selected wells ...'),
-                Menu(*led_bulk_assign_items, name='Bulk assign selected Programs to selected wells ...'))
+                enabled_when='handler.allow_bulk_assign(info)')
+            for i, led_type in enumerate(led_types)]
+        return Menu(
+            Action(name='New Program', action='info.object.new_program()'),
+            Action(name='Delete Selected', action='handler.object_delete_changed(info)'),
+            Action(name='Duplicate Selected', action='handler.object_duplicate_changed(info)'),
+            Action(name='Create dark Step with program duration', action='handler.dark_step(info)'),
+            Menu(*add_steps_items, name='Add program steps to ...'),
+            Menu(*led_assign_items, name='Assign Program to selected wells ...'),
+            Menu(*led_bulk_assign_items, name='Bulk assign selected Programs to selected wells ...'))
 
     @on_trait_change('app.plate.selected, app.all_programs.selected')
     def _allow_assign(self):
@@ -907,25 +1096,34 @@ class ProgramListHandler(Controller):
         return allow
 
     def dark_step(self, info):
+        new_steps = []
         for program in info.object.selected:
-            duration = sum([step.duration for step in program.steps])
+            duration = program.total_duration
             if duration > MAX_STEP_DURATION:
                 msg = 'Dark Step for program %s would exceed maximum duration (%d ms, maximum is %d ms).'
                 msg = msg % (program.name, duration, MAX_STEP_DURATION)
                 error(msg, 'Cannot create Dark Step')
+                continue
             name = 'Dark_' + program.name
-            new_step = Step(name=name, duration=duration)
-            self.app.all_steps.add_step(new_step)
+            new_steps.append(Step(name=name, duration=duration))
+        # Add all Steps at once to update the Step list only once
+        self.app.all_steps.add_steps(new_steps)
 
     def object_delete_changed(self, info):
         """ Remove selected Programs from Program list. """
+        selected = info.object.selected
         programs_to_delete = []
-        for program in info.object.selected:
-            confirm = self.confirm_delete(program)
-            if confirm == utils.YES:
-                programs_to_delete.append(program)
-            elif confirm == utils.CANCEL:
-                break
+        if len(selected) > 3:
+            # Ask only once for larger selections
+            if self.confirm_delete_many(selected) == utils.YES:
+                programs_to_delete = list(selected)
+        else:
+            for program in selected:
+                confirm = self.confirm_delete(program)
+                if confirm == utils.YES:
+                    programs_to_delete.append(program)
+                elif confirm == utils.CANCEL:
+                    break
         info.object.delete_programs(programs_to_delete)
 
     def object_delete_all_changed(self, info):
@@ -934,51 +1132,63 @@ class ProgramListHandler(Controller):
             # reasons.
             # Although there will currently only ever be one plate, handle
             # potential multiple plates.
-            for program in info.object.programs:
-                plates = [led.well.plate for led in program.assigned_leds]
-            for plate in plates:
-                plate.start_update('updated')
-
-            info.object.delete_all_programs()
-            info.object.selected = []
-
-            for plate in plates:
-                plate.stop_update('updated')
+            plates = {
+                led.well.plate
+                for program in info.object.programs
+                for led in program.assigned_leds}
+            with contextlib.ExitStack() as stack:
+                for plate in plates:
+                    stack.enter_context(plate.batched_updates())
+                info.object.delete_all_programs()
+                info.object.selected = []
 
     def object_new_changed(self, info):
         info.object.new_program()
 
     def object_duplicate_changed(self, info):
         new_programs = [program.duplicate() for program in info.object.selected]
-        info.object.start_update('updated')
-        info.object.add_programs(new_programs)
-        info.object.stop_update('updated')
+        with info.object.batched_updates():
+            info.object.add_programs(new_programs)
 
     def confirm_delete(self, program):
         """
         Ask the user to confirm Program deletion if the Program has Steps or is
         assigned to LEDs.
         """
-        steps = ['  * ' + step.name for step in program.steps]
+        steps = program.steps
+        if not steps and not program.assigned_leds:
+            return utils.YES
+
         msg_steps = ''
         if steps:
             if len(steps) < 10:
                 msg_steps = '\nIt contains the following Steps:\n'
-                msg_steps += '\n'.join(steps)
+                msg_steps += '\n'.join('  * ' + step.name for step in steps)
             else:
                 msg_steps = '\nIt contains %d Steps.\n' % len(steps)
         msg_leds = ''
         if program.assigned_leds:
             msg_leds = '\nIt is assigned to %d LEDs.\n' % len(program.assigned_leds)
 
-        if steps or program.assigned_leds:
-            msg = "Are you sure you want to delete Program '%s'?" % program.name
-            msg += msg_steps
-            msg += msg_leds
-            confirm = ProgramDeleteWarning(message=msg)
-        else:
-            confirm = utils.YES
+        msg = "Are you sure you want to delete Program '%s'?" % program.name
+        msg += msg_steps
+        msg += msg_leds
+        confirm = ProgramDeleteWarning(message=msg)
+        return confirm
 
+    def confirm_delete_many(self, programs):
+        """
+        Ask the user to confirm deletion of multiple Programs at once if any
+        of them have Steps or are assigned to LEDs.
+        """
+        n_steps = sum(len(program.steps) for program in programs)
+        n_leds = sum(len(program.assigned_leds) for program in programs)
+        if not n_steps and not n_leds:
+            return utils.YES
+
+        msg = 'Are you sure you want to delete %d Programs?\n' % len(programs)
+        msg += '\nThey contain %d Steps and are assigned to %d LEDs.\n' % (n_steps, n_leds)
+        confirm = ProgramDeleteManyWarning(message=msg)
         return confirm
 
     def confirm_delete_all(self):
@@ -999,10 +1209,17 @@ class ProgramListHandler(Controller):
         """
         for dst_program in self.app.all_programs.programs:
             if dst_program.ID == to_program:
-                for src_program in info.object.selected:
-                    # Avoid infinite loop if src_program is dst_program
-                    steps_to_add = [step for step in src_program.steps]
-                    dst_program.add_steps(steps_to_add)
+                break
+        else:
+            return
+
+        for src_program in info.object.selected:
+            if src_program is dst_program:
+                # Avoid infinite loop if src_program is dst_program
+                steps_to_add = tuple(src_program.steps)
+            else:
+                steps_to_add = src_program.steps
+            dst_program.add_steps(steps_to_add)
 
     def assign_to(self, info, to_led):
         """
@@ -1016,20 +1233,23 @@ class ProgramListHandler(Controller):
     def object_assign_changed(self, info):
         plate = self.app.plate
         program = self.app.current_program.program
-        to_led = info.object._assign_to_choices.index(info.object.assign_to)
+        to_led = info.object._assign_to_index[info.object.assign_to]
         plate.assign_to_selected(to_led, program)
 
     def object_bulk_assign_changed(self, info):
-        to_led = info.object._assign_to_choices.index(info.object.assign_to)
+        to_led = info.object._assign_to_index[info.object.assign_to]
         self.bulk_assign_to(info, to_led)
 
     def bulk_assign_to(self, info, to_led):
         """
         Assign all selected programs to selected wells in the order of selection.
         """
-        pairs = zip(self.app.plate.selected_well_groups, info.object.selected)
-        for well, program in pairs:
-            well.assign_program(to_led, program)
+        plate = self.app.plate
+        pairs = list(zip(plate.selected_well_groups, info.object.selected))
+        # Redraw the Plate table once, not after every assignment
+        with plate.batched_updates(), plate.batched_updates('size_update'):
+            for well, program in pairs:
+                well.assign_program(to_led, program)
 
 
 class ProgramList(utils.Updateable):
@@ -1068,12 +1288,20 @@ class ProgramList(utils.Updateable):
     assign_to = Enum(values='_assign_to_choices', tooltip='LED to assign to.')
     _assign_to_choices = Property(List, depends_on='app.plate.config.led_types')
 
+    @cached_property
     def _get__assign_to_choices(self):
         if self.app is not None:
             return self.app.plate.config.led_types
         else:
             return [None]
 
+    # Index of each choice in `_assign_to_choices`.
+    _assign_to_index = Property(Dict, depends_on='app.plate.config.led_types')
+
+    @cached_property
+    def _get__assign_to_index(self):
+        return {choice: i for i, choice in enumerate(self._assign_to_choices)}
+
     # --------------------------------------------------------------------------
     # View
     # --------------------------------------------------------------------------
@@ -1109,10 +1337,9 @@ class ProgramList(utils.Updateable):
 
     def add_programs(self, programs):
         """ Add one or multiple existing Programs to the list. """
-        self.start_update('updated')
-        programs = utils.ensure_iterable(programs)
-        self.programs += programs
-        self.stop_update('updated')
+        with self.batched_updates():
+            programs = utils.ensure_iterable(programs)
+            self.programs += programs
 
     def delete_program(self, program):
         """ Remove an existing Program from the list. """
@@ -1120,15 +1347,15 @@ class ProgramList(utils.Updateable):
 
     def delete_programs(self, programs):
         """ Delete multiple programs from the Program list. """
-        self.start_update('updated')
-        programs = utils.ensure_iterable(programs)
-        programs_to_delete = [program for program in programs]
-        for program in programs_to_delete:
-            program.delete()
-        new_programs = [program for program in self.programs if program not in programs_to_delete]
-        self.programs = new_programs
-        self.selected = []
-        self.stop_update('updated')
+        with self.batched_updates():
+            programs = utils.ensure_iterable(programs)
+            programs_to_delete = list(programs)
+            for program in programs_to_delete:
+                program.delete()
+            delete_ids = {id(program) for program in programs_to_delete}
+            new_programs = [program for program in self.programs if id(program) not in delete_ids]
+            self.programs = new_programs
+            self.selected = []
 
     def delete_all_programs(self):
         """ Clear the program list. """
@@ -20,13 +20,20 @@
 Handle image and file resources.
 """
 
+import functools
 import os
-import pkg_resources
 from pyface.api import ImageResource
 from traits.api import *
 from traitsui.api import *
 
-search_path = pkg_resources.resource_filename("optoConfig96", "resources")
+# importlib.resources avoids the slow metadata scan of importing pkg_resources
+try:
+    from importlib.resources import files
+except ImportError:
+    # Python < 3.9
+    search_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+else:
+    search_path = str(files("optoConfig96") / "resources")
 
 APPICON = ImageResource(name='appicon.png', search_path=search_path)
 
@@ -41,16 +48,26 @@ class opView(View):
     icon = Instance(ImageResource, APPICON)
 
 
+@functools.lru_cache()
+def _scan_examples(examples_path):
+    """
+    Map the names of example files to their paths.
+
+    The bundled examples do not change while the program runs, so the
+    directory is only read once.
+    """
+    with os.scandir(examples_path) as entries:
+        return {
+            entry.name: entry.path
+            for entry in entries
+            if entry.name.endswith('.op96') and entry.is_file()}
+
+
 class Examples(HasTraits):
     _available_examples = Property
 
     def _get__available_examples(self):
-        examples_path = os.path.join(search_path, 'examples')
-        examples = {}
-        for fname in os.listdir(examples_path):
-            if fname.endswith('.op96'):
-                examples[fname] = (os.path.join(examples_path, fname))
-        return examples
+        return _scan_examples(os.path.join(search_path, 'examples'))
 
     # The user may pick an example to open
     picked = Enum(values='_example_choices', tooltip='Pick an example file to open.')
@@ -73,14 +90,20 @@ class Examples(HasTraits):
     )
 
 
+@functools.lru_cache()
+def _read_license():
+    """ Return the license text, reading it from disk on first use. """
+    with open(os.path.join(search_path, 'LICENSE.txt')) as flic:
+        license = flic.read()
+    return license
+
+
 class License(HasTraits):
 
     license = Str
 
     def _license_default(self):
-        with open(os.path.join(search_path, 'LICENSE.txt')) as flic:
-            license = flic.read()
-        return license
+        return _read_license()
 
     view = opView(
         UItem('license', style='readonly'), scrollable=True)
@@ -25,6 +25,8 @@ from .ui import *
 from traitsui.menu import Menu, Action
 from traitsui.table_column import ObjectColumn
 
+import functools
+import random
 import numpy as np
 
 from .plots import StepPlot
@@ -36,6 +38,34 @@ StepDeleteWarning = utils.ConfirmationDialog()
 StepDeleteAllWarning = utils.ConfirmationDialog()
 
 
+@functools.lru_cache(maxsize=4096)
+def _format_converted_units(intensity, conversions):
+    """
+    Format an intensity in the physical units of each LED.
+
+    Shared by all Steps, which often have the same intensity.
+
+    Parameters
+    ----------
+    intensity : int
+    conversions : tuple of (led name, conversion factor, unit) tuples
+        The unit is None if it is not defined for the LED.
+    """
+    units = []
+    for led, factor, unit in conversions:
+        if unit is None:
+            value = 'NA'
+        else:
+            try:
+                value = '%.1f %s' % (intensity / factor, unit)
+            except TypeError:
+                # Factor is 'NA'
+                value = 'NA'
+        text = '{name}: {value}'.format(name=led, value=value)
+        units.append(text)
+    return '\n'.join(units)
+
+
 class StepHandler(Handler):
     """ Handler for the Step view. """
 
@@ -71,17 +101,16 @@ class AStep(utils.Updateable):
             'name'
         )
 
-    def __setattr__(self, name, value):
-        if name in self._core_params or name in self._dirty_params:
-            super().__setattr__('dirtied', True)
-        super().__setattr__(name, value)
+    @on_trait_change(', '.join(_core_params + _dirty_params))
+    def _mark_dirty(self):
+        self.dirtied = True
 
     # Event to indicate that the size requirement on the Arduino changed.
     size_update = Event
 
     @on_trait_change('intensity, duration, is_pulsed, pulse_on, pulse_off')
     def fire_size_update(self):
-        self.size_update = True
+        self.fire('size_update')
 
 
 class BaseStep(AStep):
@@ -121,30 +150,39 @@ class BaseStep(AStep):
 
     def copy_params(self, to):
         """ Copy one step's parameters to another step. """
-        for param in (self._core_params):
-                setattr(to, param, getattr(self, param))
+        # Signal a new size requirement once, not for each parameter
+        with to.batched_updates('size_update'):
+            for param in self._core_params:
+                value = getattr(self, param)
+                # Skip equal values, which would still mark `to` as dirty
+                if getattr(to, param) != value:
+                    setattr(to, param, value)
 
     # Input validation
-    invalid = Property
-    pulse_on_invalid = Property
-    duration_long_invalid = Property
-    duration_short_invalid = Property
+    invalid = Property(depends_on='duration, is_pulsed, pulse_on')
+    pulse_on_invalid = Property(depends_on='duration, is_pulsed, pulse_on')
+    duration_long_invalid = Property(depends_on='duration')
+    duration_short_invalid = Property(depends_on='duration')
 
+    @cached_property
     def _get_invalid(self):
         """ Is this Step definition invalid? """
         return self.pulse_on_invalid or self.duration_long_invalid or self.duration_short_invalid
 
+    @cached_property
     def _get_pulse_on_invalid(self):
         """
         The pulse ON duration should be lower than or equal to the Step duration.
         """
         return self.is_pulsed and self.duration < self.pulse_on
 
+    @cached_property
     def _get_duration_long_invalid(self):
         """ Step duration cannot exceed the maximum allowed duration.
         """
         return self.duration > MAX_STEP_DURATION
 
+    @cached_property
     def _get_duration_short_invalid(self):
         return self.duration < 100
 
@@ -171,59 +209,53 @@ class BaseStep(AStep):
 
     @cached_property
     def _get_converted_units(self):
-        units = []
-        for led, factor in self.conversion_factors.items():
-            try:
-                value = self.intensity / factor
-                unit = self.units[led]
-                value = '%.1f %s' % (value, unit)
-            except (TypeError, KeyError):
-                value = 'NA'
-            text = '{name}: {value}'.format(name=led, value=value)
-            units.append(text)
-        return '\n'.join(units)
+        conversions = tuple(
+            (led, factor, self.units.get(led))
+            for led, factor in self.conversion_factors.items())
+        return _format_converted_units(self.intensity, conversions)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._sync_internals()
 
     def default_traits_view(self):
-        view = View(
-            Item(
-                'duration_ui',
-                editor=InstanceEditor(),
-                style='custom',
-                label='Duration'),
-            Item(
-                'intensity',
-                editor=RangeEditor(low=0, high=4095),
-                style='custom',
-                label='Intensity'),
-            Group(UItem(
-                'converted_units',
-                style='readonly',
-                tooltip='Intensity converted to physical units. Set the conversion factor in the plate configuration.')),
-            HGroup(
-                VGroup(
-                    Item(' '),
-                    Item('is_pulsed')),
-                VGroup(
-                    Item(
-                        'pulse_on_ui',
-                        editor=InstanceEditor(),
-                        style='custom',
-                        enabled_when='is_pulsed',
-                        label='ON'),
-                    Item(
-                        'pulse_off_ui',
-                        editor=InstanceEditor(),
-                        style='custom',
-                        enabled_when='is_pulsed',
-                        label='OFF'))),
-            handler=StepHandler(),
-            kind='modal',
-            buttons=OKCancelButtons)
-        return view
+        return self.trait_view('step_view')
+
+    step_view = View(
+        Item(
+            'duration_ui',
+            editor=InstanceEditor(),
+            style='custom',
+            label='Duration'),
+        Item(
+            'intensity',
+            editor=RangeEditor(low=0, high=4095),
+            style='custom',
+            label='Intensity'),
+        Group(UItem(
+            'converted_units',
+            style='readonly',
+            tooltip='Intensity converted to physical units. Set the conversion factor in the plate configuration.')),
+        HGroup(
+            VGroup(
+                Item(' '),
+                Item('is_pulsed')),
+            VGroup(
+                Item(
+                    'pulse_on_ui',
+                    editor=InstanceEditor(),
+                    style='custom',
+                    enabled_when='is_pulsed',
+                    label='ON'),
+                Item(
+                    'pulse_off_ui',
+                    editor=InstanceEditor(),
+                    style='custom',
+                    enabled_when='is_pulsed',
+                    label='OFF'))),
+        handler=StepHandler(),
+        kind='modal',
+        buttons=OKCancelButtons)
 
     no_pulsed_view = View(
         Item(
@@ -289,10 +321,7 @@ class Step(utils.Counted, BaseStep):
     is_used = Property
 
     def _get_is_used(self):
-        for program in self.in_programs:
-            if program.is_used:
-                return True
-        return False
+        return any(program.is_used for program in self.in_programs)
 
     # Display settings
     # show as pulsed, or constant?
@@ -332,46 +361,45 @@ class Step(utils.Counted, BaseStep):
     # View
     # --------------------------------------------------------------------------
 
-    def default_traits_view(self):
-        view = View(
-            Item('name'),
-            Item(
-                'duration_ui',
-                editor=InstanceEditor(),
-                style='custom',
-                label='Duration'),
-            Item(
-                'intensity',
-                editor=RangeEditor(low=0, high=4095),
-                style='custom',
-                label='Intensity'),
-            Group(UItem(
-                'converted_units',
-                style='readonly',
-                tooltip='Intensity converted to physical units. Set the conversion factor in the plate configuration.')),
-            HGroup(
-                VGroup(
-                    Item(' '),
-                    Item('is_pulsed')),
-                VGroup(
-                    Item(
-                        'pulse_on_ui',
-                        editor=InstanceEditor(),
-                        style='custom',
-                        enabled_when='is_pulsed',
-                        label='ON'),
-                    Item(
-                        'pulse_off_ui',
-                        editor=InstanceEditor(),
-                        style='custom',
-                        enabled_when='is_pulsed',
-                        label='OFF'))),
-            handler=StepHandler())
-        return view
+    step_view = View(
+        Item('name'),
+        Item(
+            'duration_ui',
+            editor=InstanceEditor(),
+            style='custom',
+            label='Duration'),
+        Item(
+            'intensity',
+            editor=RangeEditor(low=0, high=4095),
+            style='custom',
+            label='Intensity'),
+        Group(UItem(
+            'converted_units',
+            style='readonly',
+            tooltip='Intensity converted to physical units. Set the conversion factor in the plate configuration.')),
+        HGroup(
+            VGroup(
+                Item(' '),
+                Item('is_pulsed')),
+            VGroup(
+                Item(
+                    'pulse_on_ui',
+                    editor=InstanceEditor(),
+                    style='custom',
+                    enabled_when='is_pulsed',
+                    label='ON'),
+                Item(
+                    'pulse_off_ui',
+                    editor=InstanceEditor(),
+                    style='custom',
+                    enabled_when='is_pulsed',
+                    label='OFF'))),
+        handler=StepHandler())
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.color = str(tuple(np.random.randint(0, 256, 3)))
+        rgb = random.getrandbits(24)
+        self.color = (rgb & 0xFF, (rgb >> 8) & 0xFF, (rgb >> 16) & 0xFF)
 
     def __repr__(self):
         string = 'Step #{ID} ({name}) '
@@ -441,17 +469,7 @@ class Step(utils.Counted, BaseStep):
         if not self.is_pulsed or self.pulse_on == 0 or self.pulse_off == 0 or self.duration == 0:
             return np.array((0, self.duration))
         else:
-            xs = [0]
-            on = False  # LED is initially off.
-
-            while xs[-1] < self.duration:
-                if not on:
-                    nxt = xs[-1] + self.pulse_on
-                if on:
-                    nxt = xs[-1] + self.pulse_off
-                xs.append(min(nxt, self.duration))
-                on = not on  # swap state
-        return np.array(xs)
+            return _pulse_edges(self.duration, self.pulse_on, self.pulse_off)
 
     ys = Property(depends_on='plot_update')
 
@@ -478,25 +496,35 @@ class Step(utils.Counted, BaseStep):
 
         if not pulsed:
             # Step is not shown as pulsed
-            # Delegate to handle edge cases
-            xs = self.get_xs(pulsed)
-            ys = np.zeros_like(xs)
-            ys[self.is_on(xs)] = self.intensity
-            return ys
+            return self._constant_ys(self.get_xs(pulsed))
         else:
             # Step is shown as pulsed
             return self._ys_pulsed
 
-    _ys_pulsed = Property(depends_on='duration, pulse_on, pulse_off, intensity')
+    _ys_pulsed = Property(depends_on='duration, is_pulsed, pulse_on, pulse_off, intensity')
 
     @cached_property
     def _get__ys_pulsed(self):
         xs = self._xs_pulsed
-        ys = np.zeros_like(xs)
-        ys[self.is_on(xs)] = self.intensity
+        if not self.is_pulsed or self.pulse_on == 0 or self.pulse_off == 0 or self.duration == 0:
+            return self._constant_ys(xs)
 
+        # `_xs_pulsed` alternates between the starts of ON and OFF phases
+        ys = np.zeros_like(xs)
+        ys[::2] = self.intensity
+        # Do not show a switch at the end of the Step
+        ys[-1] = ys[-2]
         return ys
 
+    def _constant_ys(self, xs):
+        """ Y values for a Step which does not switch during `xs`.
+
+        Delegate to `is_on` to handle edge cases.
+        """
+        if self.is_on(xs[:1])[0]:
+            return np.full_like(xs, self.intensity)
+        return np.zeros_like(xs)
+
     def is_on(self, times):
         """Return if the Step is ON at `times`.
 
@@ -515,21 +543,21 @@ class Step(utils.Counted, BaseStep):
         """
         # Edge cases:
         if not self.is_pulsed:
-            return np.ones_like(times).astype(np.bool)
+            return np.ones(np.shape(times), dtype=bool)
 
         if self.pulse_on == 0 and self.pulse_off == 0:
             # ON is 0 and OFF is 0: not pulsed, always on
-            return np.ones_like(times).astype(np.bool)
+            return np.ones(np.shape(times), dtype=bool)
         elif self.pulse_on == 0 and self.pulse_off > 0:
             # Only ON is 0: always off
-            return np.zeros_like(times).astype(np.bool)
+            return np.zeros(np.shape(times), dtype=bool)
         elif self.pulse_off == 0 and self.pulse_on > 0:
             # Only OFF is 0: always on
-            return np.ones_like(times).astype(np.bool)
+            return np.ones(np.shape(times), dtype=bool)
 
         period = self.pulse_on + self.pulse_off
-        cycles = (times / period).astype(np.int)
-        is_on = times < period * cycles + self.pulse_on
+        # Time into the current cycle; integer milliseconds stay integer
+        is_on = np.asarray(times) % period < self.pulse_on
         # If the step is switching at the end of its duration, do not show this:
         # the next step will start
         if is_on.shape[0] > 1:
@@ -538,6 +566,20 @@ class Step(utils.Counted, BaseStep):
 
         return is_on
 
+    def is_on_scalar(self, time):
+        """Return if the Step is ON at a single `time`.
+
+        Scalar version of `is_on`, without the overhead of creating arrays.
+        """
+        if not self.is_pulsed:
+            return True
+        if self.pulse_on == 0:
+            # Always off, unless OFF is 0 as well
+            return self.pulse_off == 0
+        if self.pulse_off == 0:
+            return True
+        return bool(time % (self.pulse_on + self.pulse_off) < self.pulse_on)
+
     @on_trait_change('name, duration, intensity, show_pulsed, is_pulsed, pulse_on, pulse_off, color')
     def fire_plot_update(self, obj, name, old, new):
         signal = (self.ID, name)
@@ -603,15 +645,36 @@ class StepEditor(AStepEditor):
         resizable=True, scrollable=True
     )
 
+    def __init__(self, *args, **kwargs):
+        # Bursts of Step changes, e.g. while dragging a slider, only update the
+        # figure once per frame.
+        self._update_figure_later = utils.DeferredCall(self._update_figure, delay=16)
+        # (xs, ys, color, title) currently shown in the figure
+        self._shown = None
+        super().__init__(*args, **kwargs)
+
     @on_trait_change('step.plot_update')
     def update_figure(self):
-        self._update_figure()
+        self._update_figure_later()
 
     def _update_figure(self):
+        """ Update the parts of the figure which changed, if any. """
+        xs, ys = self.step.xs, self.step.ys
+        color, title = self.step._color, self.step.name
+        if self._shown is None:
+            xy_changed = True
+        else:
+            shown_xs, shown_ys, shown_color, shown_title = self._shown
+            xy_changed = not (np.array_equal(xs, shown_xs) and np.array_equal(ys, shown_ys))
+            if not xy_changed and color == shown_color and title == shown_title:
+                return
+        self._shown = (xs, ys, color, title)
+
         self.plot._is_updating = True
-        self.plot.set_xydata(self.step.xs, self.step.ys)
-        self.plot.lines[0].set_color(self.step._color)
-        self.plot.axes.set_title(self.step.name)
+        if xy_changed:
+            self.plot.set_xydata(xs, ys)
+        self.plot.lines[0].set_color(color)
+        self.plot.axes.set_title(title)
         self.plot.draw()
 
 
@@ -621,6 +684,42 @@ class NoStepEditor(AStepEditor):
     view = View(Label('Create or select a Step to show the editor.'))
 
 
+@functools.lru_cache(maxsize=512)
+def _pulse_edges(duration, pulse_on, pulse_off):
+    """
+    Return the times at which a pulsed Step switches, starting with 0 and
+    ending with `duration`.
+
+    Steps with the same timing share the result, which is read-only.
+    """
+    if pulse_on >= duration:
+        # The Step ends during the first ON phase
+        xs = np.array((0, duration))
+    elif pulse_on + pulse_off >= duration:
+        # The Step ends during the first OFF phase
+        xs = np.array((0, pulse_on, duration))
+    else:
+        # Alternate between ON and OFF phases, then cut off at the first
+        # switch which is not before the end of the Step.
+        n_cycles = -(-duration // (pulse_on + pulse_off))
+        phases = np.empty(2 * n_cycles + 1, dtype=np.int64)
+        phases[0] = 0
+        phases[1::2] = pulse_on
+        phases[2::2] = pulse_off
+        xs = np.cumsum(phases)
+        end = np.searchsorted(xs, duration)
+        xs = xs[:end + 1]
+        xs[-1] = duration
+    xs.setflags(write=False)
+    return xs
+
+
+@functools.lru_cache(maxsize=512)
+def _format_value_unit(value, unit):
+    """ Format a time for the Step table, which repaints cells often. """
+    return '%d %s' % (value, unit)
+
+
 class StepColumn(ObjectColumn):
     """ Defines a column of the StepList table. """
 
@@ -640,11 +739,8 @@ class StepColumn(ObjectColumn):
             return ['No', 'Yes'][getattr(object, self.name)]
 
         if 'value_out' in self.name:
-            attr = self.name.split('.')
-            obj = getattr(object, attr[0])
-            value = getattr(obj, 'value_out')
-            unit = getattr(obj, 'unit')
-            return '%d %s' % (value, unit)
+            obj = getattr(object, self.name.partition('.')[0])
+            return _format_value_unit(obj.value_out, obj.unit)
 
         return super().get_value(object)
 
@@ -712,10 +808,14 @@ class StepListHandler(Controller):
         Provide steps with information about the current plate configuration, in
         particular conversion factors for physical units.
         """
+        conversion_factors = self.app.plate.config.conversion_factors
+        units = self.app.plate.config.units
         for step in self.info.object.steps:
-            self.app.plate.config.conversion_factors
-            step.conversion_factors = self.app.plate.config.conversion_factors
-            step.units = self.app.plate.config.units
+            # Only Steps which are new or outdated need to be updated
+            if step.conversion_factors != conversion_factors:
+                step.conversion_factors = conversion_factors
+            if step.units != units:
+                step.units = units
 
     def populate_rightclick_menu(self, info):
         """
@@ -819,6 +919,7 @@ class StepListHandler(Controller):
         for program in self.app.all_programs.programs:
             if program.ID == to_program:
                 program.add_steps(info.object.selected)
+                break
 
     def object_assign_changed(self, info):
         program = self.app.current_program.program
@@ -912,10 +1013,9 @@ class StepList(utils.Updateable):
 
     def add_steps(self, steps):
         """ Add one or multiple existing Steps to the list. """
-        self.start_update('updated')
-        steps = utils.ensure_iterable(steps)
-        self.steps += steps
-        self.stop_update('updated')
+        with self.batched_updates():
+            steps = utils.ensure_iterable(steps)
+            self.steps.extend(steps)
 
     def delete_step(self, step):
         """
@@ -931,13 +1031,16 @@ class StepList(utils.Updateable):
         self.start_update('updated')
         steps = utils.ensure_iterable(steps)
         steps_to_delete = [step for step in steps]
-        # Set the updating flag for all programs the steps are associated with
-        updating_programs = []
+        # Set the updating flag for all programs the steps are associated with,
+        # once per program
+        updating_programs = set()
         for step in steps_to_delete:
             for program in step.in_programs:
-                program.start_update('steps_updated')
-                updating_programs.append(program)
-        new_steps = [step for step in self.steps if step not in steps_to_delete]
+                if program not in updating_programs:
+                    program.start_update('steps_updated')
+                    updating_programs.add(program)
+        delete_ids = {id(step) for step in steps_to_delete}
+        new_steps = [step for step in self.steps if id(step) not in delete_ids]
         for step in steps_to_delete:
             step.delete()
         for program in updating_programs:
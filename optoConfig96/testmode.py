@@ -20,13 +20,16 @@
 Show animated heatmaps to simulate an experiment in silico.
 """
 
+import queue
 import time
 from threading import Thread
 import matplotlib as mpl
 from matplotlib.axes import Axes
+from matplotlib.collections import LineCollection
 from matplotlib.figure import Figure
 
 import numpy as np
+from pyface.qt import QtCore
 
 from .ui import *
 from .plates import Plate
@@ -77,33 +80,131 @@ class TimeUnitSlider(utils.TimeUnit):
 
 
 class SliderUpdate:
+    """
+    Advance the simulated time in a worker thread.
+
+    Time increments are put into `q`, which holds a single sum of all
+    increments not consumed yet. The player adds them to its current time in
+    the GUI thread, so frames which are not drawn in time are dropped instead
+    of piling up, and times set by the user in the meantime are respected.
+    """
+
     def __init__(self, player):
         self._running = True
         self.player = player
         self.lastframe = None
+        self.q = queue.Queue(maxsize=1)
 
     def stop(self):
         self._running = False
 
+    def _put(self, increment):
+        """ Add `increment` to an increment which has not been consumed yet. """
+        try:
+            self.q.put_nowait(increment)
+        except queue.Full:
+            try:
+                increment += self.q.get_nowait()
+            except queue.Empty:
+                pass
+            self.q.put_nowait(increment)
+
+    # Shortest interval between two new times, in seconds
+    frame_period = 1 / 60
+
+    def _wait_for_frame(self):
+        """
+        Sleep until the next frame is due.
+
+        Frames are due every `frame_period`, but not before the simulated time
+        advanced by at least 1 ms.
+        """
+        timefactor = self.player.timefactor
+        period = self.frame_period
+        if timefactor > 0:
+            period = max(period, 1 / (1000 * timefactor))
+        delay = self.lastframe + period - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
     def update(self):
         while self._running:
             if not self.lastframe:
-                self.lastframe = time.time()
-                increment = 0
-            else:
-                # elapsed seconds since last frame
-                elapsed = time.time() - self.lastframe
-                elapsed_ms = elapsed * 1000
-                increment = round(elapsed_ms * self.player.timefactor)
-                if increment <= 0:
-                    continue
-            self.lastframe = time.time()
-            new_value = self.player.time + increment
-            if new_value >= self.player.time_ui._time_max:
-                self.player.time = self.player.time_ui._time_max
-                self.stop()
-            else:
-                self.player.time = new_value
+                self.lastframe = time.monotonic()
+                continue
+            self._wait_for_frame()
+            now = time.monotonic()
+            # elapsed seconds since last frame
+            elapsed = now - self.lastframe
+            elapsed_ms = elapsed * 1000
+            increment = round(elapsed_ms * self.player.timefactor)
+            if increment <= 0:
+                continue
+            self.lastframe = now
+            self._put(increment)
+
+
+class ProgramTimelines:
+    """
+    The Steps of several programs, packed into arrays.
+
+    Evaluates the intensities of all programs at a given time with a few
+    array operations, instead of looking up the active Step of each program.
+    """
+
+    def __init__(self, programs):
+        self.n_programs = len(programs)
+        starts = []
+        ends = []
+        periods = []
+        on_times = []
+        intensities = []
+        step_programs = []
+        # Last Steps of programs which repeat them after the end
+        repeat_steps = []
+        for program_n, program in enumerate(programs):
+            end = 0
+            for step in program.steps:
+                starts.append(end)
+                end += step.duration
+                ends.append(end)
+                period, on_time = self._pulse_cycle(step)
+                periods.append(period)
+                on_times.append(on_time)
+                intensities.append(step.intensity)
+                step_programs.append(program_n)
+            if program.steps and program._after_end == 'repeat':
+                repeat_steps.append(len(starts) - 1)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.ends = np.array(ends, dtype=np.int64)
+        self.periods = np.array(periods, dtype=np.int64)
+        self.on_times = np.array(on_times, dtype=np.int64)
+        self.step_intensities = np.array(intensities, dtype=float)
+        self.step_programs = np.array(step_programs, dtype=int)
+        self.repeat_steps = np.array(repeat_steps, dtype=int)
+
+    @staticmethod
+    def _pulse_cycle(step):
+        """
+        Return the period and ON time of the pulse cycle of `step`.
+
+        Steps which are always ON or always OFF get a period of 1 and an ON
+        time of 1 or 0, respectively.
+        """
+        if step.is_pulsed and step.pulse_on > 0 and step.pulse_off > 0:
+            return step.pulse_on + step.pulse_off, step.pulse_on
+        return 1, int(step.is_on_scalar(0))
+
+    def intensities(self, time):
+        """ Return the intensities of the programs at `time`. """
+        # Each program has at most one active Step
+        active = (self.starts <= time) & (time < self.ends)
+        active[self.repeat_steps] |= time >= self.ends[self.repeat_steps]
+        t_step = time - self.starts[active]  # time the steps were active
+        is_on = t_step % self.periods[active] < self.on_times[active]
+        intensities = np.zeros(self.n_programs)
+        intensities[self.step_programs[active]] = self.step_intensities[active] * is_on
+        return intensities
 
 
 class ExperimentPlayerHandler(Handler):
@@ -117,6 +218,7 @@ class ExperimentPlayerHandler(Handler):
         if info.object.updatethread is not None:
             info.object.updatethread.stop()
             info.object.updathread = None
+        info.object._stop_frame_timer()
         return True
 
 
@@ -136,8 +238,9 @@ class ExperimentPlayer(HasTraits):
         self.sync_trait('time', self.time_ui, 'value_base')
         self.sync_trait('time_end', self.time_ui, '_time_max', mutual=False)
 
-    time_end = Property
+    time_end = Property(depends_on='plate.updated')
 
+    @cached_property
     def _get_time_end(self):
         return self.plate.done_after()
 
@@ -164,7 +267,7 @@ class ExperimentPlayer(HasTraits):
         figure = Figure()
         axis = figure.add_subplot(111)
         self.axis = axis
-        n = len(self.plate.config.led_types)
+        n = len(self._led_types)
         rowspergroup = 8 / self.plate.nrows
         colspergroup = 12 / self.plate.ncols
         axis.set_yticks(np.arange((n * rowspergroup - 1) * 0.5, 8 * n, n * rowspergroup))
@@ -173,21 +276,42 @@ class ExperimentPlayer(HasTraits):
         axis.set_xticklabels(np.arange(self.plate.ncols) + 1)
         grid_y = np.arange(-0.5, 8 * n, n * rowspergroup)[1::]
         grid_x = np.arange(colspergroup - 1 + 0.5, 12.5, colspergroup)[:-1]
-        # Draw gridlines manually; axis.grid gets lost with blitting
-        self.gridlines = []
-        for y in grid_y:
-            self.gridlines.append(axis.axhline(y, color='white', linewidth=2))
-            self.gridlines.append(axis.axhline(y, color='black', linewidth=1))
-        for x in grid_x:
-            self.gridlines.append(axis.axvline(x, color='white', linewidth=2))
-            self.gridlines.append(axis.axvline(x, color='black', linewidth=1))
+        # Draw gridlines manually; axis.grid gets lost with blitting.
+        # Each line is drawn white and wide, then black and thin on top. All
+        # of them are a single artist, so a frame draws them in one call.
+        lines = [[(-0.5, y), (11.5, y)] for y in grid_y]
+        lines += [[(x, -0.5), (x, 8 * n - 0.5)] for x in grid_x]
+        self.gridlines = LineCollection(
+            [line for line in lines for _ in range(2)],
+            colors=['white', 'black'] * len(lines),
+            linewidths=[2, 1] * len(lines))
+        axis.add_collection(self.gridlines, autolim=False)
         axis.tick_params(top=True, labeltop=True)
         self.heatmap = self.axis.imshow(
             self.heatmap_data(),
-            aspect=1 / len(self.plate.led_types),
+            aspect=1 / n,
             interpolation='nearest')
+        # The heatmap and the gridlines on top of it are blitted onto a cached
+        # background in `update_plot`.
+        self.heatmap.set_animated(True)
+        self.gridlines.set_animated(True)
         return figure
 
+    # The canvas the figure was last drawn on, and its background without the
+    # animated artists.
+    _canvas = Any
+    _background = Any
+
+    def _draw_animated(self):
+        self.axis.draw_artist(self.heatmap)
+        self.axis.draw_artist(self.gridlines)
+
+    def _cache_background(self, event):
+        """ Cache the background after a full draw of the canvas. """
+        self._background = event.canvas.copy_from_bbox(self.axis.bbox)
+        # Animated artists are skipped by full draws
+        self._draw_animated()
+
     cmaps = List
 
     def _cmaps_default(self):
@@ -196,114 +320,243 @@ class ExperimentPlayer(HasTraits):
         for led_type in self.plate.config.led_types:
             name = led_type.name
             # Create a cmap from black to the defined LED color
-            led_color_end = utils.qt_color_to_rgb(led_type.color)
+            led_color_end = led_type.rgb
             led_color_start = (1, 1, 1, 1)
             colors = [led_color_start, led_color_end]
             cmap = mpl.colors.LinearSegmentedColormap.from_list(name, colors, 4095)
             cmaps.append(cmap)
         return cmaps
 
+    # RGBA lookup tables of the colormaps, with one entry per intensity.
+    _luts = List
+
+    def __luts_default(self):
+        return [cmap(np.linspace(0, 1, 4096), bytes=True) for cmap in self.cmaps]
+
     def __init__(self, *args, **kwargs):
+        self._update_plot_later = utils.DeferredCall(self._update_plot)
         super().__init__(*args, **kwargs)
         # Checkboxes to show LED types
         for i, led_type in enumerate(self.plate.config.led_types):
             name = 'ledbox_%d' % i
             self.add_trait(name, Bool(True, label='Show ' + led_type.name))
+        self._update_show_leds()
+        self._plate_updated()
         self._sync_internals()
         self.plotinit = False
 
+    def _index_wells(self):
+        """
+        Index the positions and programs of the wells for each LED.
+
+        Wells which share a program also share its intensity, so each distinct
+        program is evaluated only once per frame in `timedata`, all at once by
+        a `ProgramTimelines`.
+        """
+        self._led_programs = []
+        for led_n in range(len(self._led_types)):
+            programs = {}
+            rows = []
+            cols = []
+            program_idx = []
+            for well in self.plate.wells:
+                program = well.leds[led_n].program
+                if program is None:
+                    continue
+                rows.append(well.pos_row)
+                cols.append(well.pos_col)
+                program_idx.append(programs.setdefault(program, len(programs)))
+            self._led_programs.append((
+                ProgramTimelines(list(programs)),
+                np.array(rows, dtype=int),
+                np.array(cols, dtype=int),
+                np.array(program_idx, dtype=int)))
+
+    @on_trait_change('plate.updated')
+    def _plate_updated(self):
+        # LED types are looked up for every frame
+        self._led_types = tuple(self.plate.led_types)
+        self._rgba_buf = np.empty((8 * len(self._led_types), 12, 4), dtype=np.uint8)
+        self._index_wells()
+        self._apply_corrections_changed()
+        self._precomp = None
+        if not self._precompute_possible:
+            self.precompute = False
+
+    def _apply_corrections_changed(self):
+        """
+        Prepare the correction factors of the LEDs, if they are applied.
+
+        Static handler, so it runs before `update_plot` uses the factors.
+        """
+        self._corr = [
+            np.ascontiguousarray(led_type.correction_factors, dtype=np.float32)
+            if self.apply_corrections and led_type.correction_factors is not None
+            else None
+            for led_type in self._led_types]
+
     def get_show_led(self, led_n):
         """ Return True if the specified LED is shown in the heatmap. """
         return getattr(self, 'ledbox_%d' % led_n)
 
+    @on_trait_change('ledbox+')
+    def _update_show_leds(self):
+        """ Cache the checkbox states, which are looked up for every frame. """
+        self._show_leds = np.array([
+            self.get_show_led(led_n)
+            for led_n in range(len(self.plate.config.led_types))], dtype=bool)
+
+    # Render all frames of the simulation in advance
+    precompute = Bool(False, label='Precompute Frames', tooltip='Render all frames before the simulation is played. Playback and scrubbing are faster, but frames are only rendered every 16 ms of the experiment. Only available for experiments up to about 5 minutes long.')
+
+    # Interval in ms of experiment time between precomputed frames
+    _precompute_step = 16
+
+    # Maximum number of precomputed frames, so rendering them takes well
+    # under a second.
+    _precompute_max_frames = 20000
+
+    _precompute_possible = Property(depends_on='plate.updated')
+
+    @cached_property
+    def _get__precompute_possible(self):
+        return self.time_end // self._precompute_step + 1 <= self._precompute_max_frames
+
+    # Precomputed RGBA frames, one per `_precompute_step`, or None.
+    _precomp = Any
+
+    # Display settings the frames were precomputed with
+    _precomp_settings = Any
+
+    def _display_settings(self):
+        return (
+            self.maxslider,
+            self.apply_corrections,
+            tuple(self._show_leds))
+
+    def _precompute_frames(self):
+        """ Render the frames of the simulation, if there are not too many. """
+        if not self._precompute_possible:
+            return
+        step = self._precompute_step
+        n_frames = self.time_end // step + 1
+        frames = np.empty((n_frames,) + self._rgba_buf.shape, dtype=np.uint8)
+        for i in range(n_frames):
+            frames[i] = self.heatmap_data(i * step)
+        self._precomp = frames
+        self._precomp_settings = self._display_settings()
+
+    def _precompute_changed(self, new):
+        self._precomp = None
+        if new:
+            self._precompute_frames()
+
+    def _get_frame(self):
+        """ Return the RGBA data to show at the current time. """
+        if self._precomp is not None:
+            if self._precomp_settings == self._display_settings():
+                frame = self.time // self._precompute_step
+                return self._precomp[min(frame, len(self._precomp) - 1)]
+            # Outdated: rendered again when the simulation is started
+            self._precomp = None
+        return self.heatmap_data()
+
     @on_trait_change('time, maxslider, ledbox+, apply_corrections')
     def update_plot(self):
-        self.heatmap.set_data(self.heatmap_data())
-        self.axis.draw_artist(self.heatmap)
-        for gridline in self.gridlines:
-            self.axis.draw_artist(gridline)
-        self.figure.canvas.update()
+        # Several settings may change at once, e.g. while dragging the
+        # intensity slider. Draw only once for those.
+        self._update_plot_later()
+
+    def _update_plot(self):
+        self.heatmap.set_data(self._get_frame())
+        canvas = self.figure.canvas
+        if canvas is not self._canvas:
+            # The editor created a new canvas for the figure
+            canvas.mpl_connect('draw_event', self._cache_background)
+            self._canvas = canvas
+            self._background = None
+        if self._background is None:
+            # Draw everything once; this caches the background
+            canvas.draw()
+            return
+        canvas.restore_region(self._background)
+        self._draw_animated()
+        canvas.blit(self.axis.bbox)
 
     def timedata(self, led_n, time):
-        data = np.zeros((8, 12))
-        if not self.get_show_led(led_n):
+        data = np.zeros((8, 12), dtype=np.float32)
+        if not self._show_leds[led_n]:
             return data
-        for well in self.plate.wells:
-            led = well.leds[led_n]
-            data[well.pos_row, well.pos_col] = self.cur_intensity(led, time)
+        timelines, rows, cols, program_idx = self._led_programs[led_n]
+        if not len(program_idx):
+            return data
+        data[rows, cols] = timelines.intensities(time)[program_idx]
         return data
 
-    def interleave(self, arrays):
+    def heatmap_data(self, time=None):
         """
-        Interleave multiple arrays into one.
-
-        Parameters
-        ----------
-
-        arrays : iterable of np.ndarrays of the same shape
+        Get the heatmap_data for the current settings at `time`, by default
+        the current time.
 
-        Returns
-        -------
-        interleaved : `arrays`, interleaved along their first dimension.
+        The colorized rows of the LEDs are interleaved in a single RGBA buffer,
+        which is reused for every frame.
         """
-        n = len(arrays)
-        new_shape = list(arrays[0].shape)
-        new_shape[0] = new_shape[0] * n
-        interleaved = np.zeros(new_shape, arrays[0].dtype)
-        for i, array in enumerate(arrays):
-            interleaved[i::n] = array
-        return interleaved
-
-    def heatmap_data(self):
-        """
-        Get the heatmap_data for the current settings.
-        """
-        arrays = []
-        for led_n in range(len(self.plate.led_types)):
-            array = self.timedata(led_n, self.time)
+        if time is None:
+            time = self.time
+        n = len(self._led_types)
+        scale = (len(self._luts[0]) - 1) / self.maxslider
+        for led_n in range(n):
+            array = self.timedata(led_n, time)
             # Apply correction factors, if applicable
-            if self.apply_corrections and self.plate.config.led_types[led_n].correction_factors is not None:
-                array = array * self.plate.led_types[led_n].correction_factors
-            # Colorize
-            array = self.cmaps[led_n](array / self.maxslider)
-            arrays.append(array)
-        n = self.interleave(arrays)
-        return n
-
-    def cur_intensity(self, led, time):
-        if not led.program:
-            return 0
-        if led.program:
-            step_start = 0
-            next_start = 0
-            for step_n, step in enumerate(led.program.steps):
-                next_start += step.duration
-                if time < next_start:
-                    break
-                if step_n < len(led.program.steps) - 1:
-                    step_start = next_start
-            else:
-                if led.program._after_end == 'off':
-                    # The program is over and is not set to repeat the last step
-                    return 0
-
-        # There is an active step
-        t_step = time - step_start  # time the step was active
-        # is_on requires an array of times
-        t_step = np.array([t_step])
-        if step.is_on(t_step)[0]:
-            return step.intensity
-        else:
-            return 0
+            if self._corr[led_n] is not None:
+                np.multiply(array, self._corr[led_n], out=array)
+            # Colorize into the rows of this LED. Intensities above
+            # `maxslider` are clipped to the last color of the lookup table.
+            array *= scale
+            idx = array.astype(np.intp)
+            np.take(self._luts[led_n], idx, axis=0, out=self._rgba_buf[led_n::n], mode='clip')
+        return self._rgba_buf
+
+    # Interval in ms at which new times are taken from the update thread.
+    _frame_interval = 16
+
+    _frame_timer = Any
+
+    def _consume_frame(self):
+        """ Advance the time by the increments of the update thread. """
+        if self.updatethread is None:
+            return
+        try:
+            increment = self.updatethread.q.get_nowait()
+        except queue.Empty:
+            return
+        new_time = self.time + increment
+        if new_time >= self.time_ui._time_max:
+            # The end of the experiment is reached
+            new_time = self.time_ui._time_max
+            self.updatethread.stop()
+            self._stop_frame_timer()
+        self.time = new_time
+
+    def _stop_frame_timer(self):
+        if self._frame_timer is not None:
+            self._frame_timer.stop()
+            self._frame_timer = None
 
     def _startstop_changed(self):
         if self.updatethread is None:
+            if self.precompute and self._precomp is None:
+                self._precompute_frames()
             self.updatethread = SliderUpdate(player=self)
+            self._frame_timer = QtCore.QTimer()
+            self._frame_timer.timeout.connect(self._consume_frame)
+            self._frame_timer.start(self._frame_interval)
             t = Thread(target=self.updatethread.update)
             t.setDaemon(True)
             t.start()
         else:
             self.updatethread.stop()
+            self._stop_frame_timer()
             self.updatethread = None
 
     def _increment_changed(self, old, new):
@@ -323,6 +576,7 @@ class ExperimentPlayer(HasTraits):
                             Spring(),
                             Item('timefactor', width=100),
                             UItem('startstop'),
+                            Item('precompute', enabled_when='updatethread is None and _precompute_possible'),
                             Spring(),
                         ),
                         show_border=True, label='Simulation'
@@ -24,6 +24,7 @@ from .ui import *
 from pyface.qt import QtCore, QtGui
 from pyface.api import YES, NO, CANCEL
 
+import contextlib
 import weakref
 
 
@@ -36,33 +37,25 @@ class BackfillID():
         if maximum:
             assert start <= maximum
         self.maximum = maximum
-        self.used = []
+        # Highest used ID. Freeing an ID sequentializes the instances, so the
+        # used IDs never have gaps.
+        self._high = start - 1
+        # Weak references to the instances, in the order of their IDs, and by
+        # ID
         self.instances = []
+        self._by_id = {}
         self.start = start
 
     def count(self):
         """
-        Return the next free ID and add it to the list of used IDs.
+        Return the next free ID and mark it as used.
 
         Raises ValueError if it would be larger than the specified maximum.
         """
-        # Counter is empty: begin at start
-        if not self.used:
-            self.used.append(self.start)
-            out = self.start
-            return out
-
-        # Counter has values: Find next free number
-        for i in range(len(self.used)):
-            if i + self.start != self.used[i]:
-                out = i + self.start
-                self.used.insert(i, out)
-                return out
-
-        # No gaps: Increment highest value, unless it exceeds the maximum
-        out = self.used[-1] + 1
+        # Increment highest value, unless it exceeds the maximum
+        out = self._high + 1
         if self.maximum is None or out <= self.maximum:
-            self.used.append(out)
+            self._high = out
             return out
         else:
             raise ValueError('Counter reached its maximum (%d)' % self.maximum)
@@ -71,18 +64,24 @@ class BackfillID():
         instance.ID = self.count()
         # keep weakrefs to created instances, so the Counter does not prevent
         # garbage collection
-        self.instances.append(weakref.ref(instance))
+        ref = weakref.ref(instance)
+        self.instances.append(ref)
+        self._by_id[instance.ID] = ref
 
     def sequentialize(self):
-        self.used = []
-        for instance in self.instances:
-            if instance():
-                instance().ID = self.count()
+        self._high = self.start - 1
+        self.instances = [ref for ref in self.instances if ref() is not None]
+        self._by_id = {}
+        for ref in self.instances:
+            instance = ref()
+            if instance is not None:
+                instance.ID = self.count()
+                self._by_id[instance.ID] = ref
 
     def get_instance_ref(self, ID):
-        for instance in self.instances:
-            if instance() and instance().ID == ID:
-                return instance
+        ref = self._by_id.get(ID)
+        if ref is not None and ref() is not None:
+            return ref
 
         return None
 
@@ -98,16 +97,9 @@ class BackfillID():
         enigmatic references to objects around, preventing garbage collection
         and deletion.
         """
-        instance = self.get_instance_ref(ID)
-        try:
-            self.used.remove(ID)
-        except ValueError:
-            pass
-
-        try:
-            self.instances.remove(instance)
-        except ValueError:
-            pass
+        ref = self._by_id.pop(ID, None)
+        if ref is not None:
+            self.instances.remove(ref)
         self.sequentialize()
 
 
@@ -137,6 +129,31 @@ class Counted():
             pass
 
 
+class DeferredCall():
+    """
+    Defer calls to a function until control returns to the Qt event loop.
+
+    Calls requested in the meantime are merged into one, which uses the
+    arguments of the most recent request.
+    """
+
+    def __init__(self, fun, delay=0):
+        self.fun = fun
+        self.delay = delay  # milliseconds
+        self._args = None
+
+    def __call__(self, *args, **kwargs):
+        pending = self._args is not None
+        self._args = (args, kwargs)
+        if not pending:
+            QtCore.QTimer.singleShot(self.delay, self._run)
+
+    def _run(self):
+        args, kwargs = self._args
+        self._args = None
+        self.fun(*args, **kwargs)
+
+
 def _update_busy(fun):
     """
     Decorator to change the cursor state to busy or idle after a function call
@@ -187,6 +204,20 @@ class Updateable(HasTraits):
         if signal is not None:
             self.fire(name, signal)
 
+    @contextlib.contextmanager
+    def batched_updates(self, name='updated', signal=True):
+        """
+        Context manager version of `start_update` and `stop_update`.
+
+        Nested batches on the same object only fire `name` once, when the
+        outermost one exits.
+        """
+        self.start_update(name)
+        try:
+            yield self
+        finally:
+            self.stop_update(name, signal)
+
     def fire(self, name='updated', signal=True):
         if not self.is_updating(name):
             setattr(self, name, signal)
@@ -199,10 +230,9 @@ class Updateable(HasTraits):
 
 
 class Unit(HasTraits):
-    value_base = Property(depends_on='value_base_')  # the value in base units
-    value_out = Property(depends_on='value_out_, unit')  # the value converted to the display unit
     # Added in __init__
-    # value_base_ = Any
+    # value_base = Any  # the value in base units
+    value_out = Property(depends_on='value_out_, unit')  # the value converted to the display unit
     value_out_ = Float
     factors = Dict  # Dict of factors, mapping value_out to value_in. Defined in subclasses.
     unit = Enum(None)  # Enum of available units. Defined in subclasses
@@ -217,17 +247,12 @@ class Unit(HasTraits):
     def __init__(self, typ=Int):
         """Allow creation of different type-checked units."""
         super().__init__()
-        self.add_trait('value_base_', typ)
-
-    @cached_property
-    def _get_value_base(self):
-        return self.value_base_
+        self.add_trait('value_base', typ)
+        self.on_trait_change(self._update_value_out, 'value_base')
 
-    def _set_value_base(self, value):
-        self.value_base_ = value
+    def _update_value_out(self, value):
         self.value_out_ = value / self.factors[self.unit]
 
-    @cached_property
     def _get_value_out(self):
         return self.value_out_
 
@@ -240,9 +265,9 @@ class Unit(HasTraits):
         return value
 
     def _set_value_out(self, value):
-        # Try to set value_base_ first. If validation fails, value_out_
+        # Try to set value_base first. If validation fails, value_out_
         # will not be set either.
-        self.value_base_ = int(value * self.factors[self.unit])
+        self.value_base = int(value * self.factors[self.unit])
         self.value_out_ = value
 
     @on_trait_change('unit')
@@ -392,22 +417,24 @@ def blend_colors(colors):
         (R,G,B,[A]) tuple of blended color
     """
 
-    # Check if an alpha channel exists
-    colors_ = colors
-    if not len(colors[0]) == 4:
-        colors_ = [color + (255,) for color in colors]
-
-    rgba = list(zip(*colors_))
-    r, g, b, a = [round(sum(x) / len(colors)) for x in rgba]
+    # Colors without an alpha channel are opaque
+    has_alpha = len(colors[0]) == 4
+    r = g = b = a = 0
+    for color in colors:
+        r += color[0]
+        g += color[1]
+        b += color[2]
+        a += color[3] if has_alpha else 255
+    n = len(colors)
 
-    return (r, g, b, a)
+    return (round(r / n), round(g / n), round(b / n), round(a / n))
 
 
 def qt_color_to_rgb(color):
     """
     Convert a Qt color to an RGB(A) tuple in the 0-1 range.
     """
-    return [1 / 255 * v for v in color.getRgb()]
+    return list(color.getRgbF())
 
 
 def idx2well(idx, n_rows=8, n_cols=12):
@@ -36,7 +36,7 @@ setuptools.setup(
         'PyQt5>=5.15.4,<=5.15.7',
         'pygments>=2.9.0',
         'numpy>=1.21.1,<=1.23.5',
-        'matplotlib>=3.4.2'
+        'matplotlib>=3.5'
     ],
     extras_require = {
         'build': [